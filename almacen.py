@@ -0,0 +1,117 @@
+"""Almacén en memoria del historial de síntomas"""
+import numpy as np
+import pandas as pd
+
+from almacenamiento import COLUMNAS, COLUMNAS_CATEGORICAS, FORMATO_FECHA, aplicar_tipos
+from diario import UMBRAL_COMPACTACION
+
+
+class AlmacenSintomas:
+    """Historial cargado una sola vez y mantenido ordenado por fecha.
+
+    Los registros nuevos se escriben en el backend de almacenamiento (o en
+    su diario de escrituras, si se indica uno) y se acumulan en memoria; el
+    DataFrame solo se reconstruye cuando alguien lo consulta, sin volver a
+    leer ni a parsear el historial completo.
+    """
+
+    def __init__(self, almacenamiento, diario=None):
+        self.almacenamiento = almacenamiento
+        self.diario = diario
+        # version cambia con cada registro; version_orden solo cuando el
+        # historial se recarga o se reordena (no con simples añadidos al final)
+        self.version = 0
+        self.version_orden = 0
+        self._df = pd.DataFrame(columns=COLUMNAS)
+        self._pendientes = []
+
+    def cargar(self):
+        """Leer el historial completo (al arrancar o tras una importación)"""
+        if self.diario is None:
+            self._df = self.almacenamiento.leer()
+            self._pendientes = []
+        else:
+            # Lo que quedó en el diario sin volcar se reproduce sobre lo leído
+            self._df, filas = self.diario.leer_historial()
+            self._pendientes = [self._registro(fila) for fila in filas]
+        self.version += 1
+        self.version_orden += 1
+
+    def agregar(self, fila):
+        """Añadir un registro al almacenamiento y a la copia en memoria"""
+        if self.diario is None:
+            self.almacenamiento.agregar(fila)
+        else:
+            self.diario.anotar(fila)
+            if self.diario.entradas >= UMBRAL_COMPACTACION:
+                self.diario.compactar()
+
+        self._pendientes.append(self._registro(fila))
+        self.version += 1
+
+    def compactar(self):
+        """Volcar el diario al almacenamiento (antes de leerlo directamente)"""
+        if self.diario is not None:
+            self.diario.compactar()
+
+    def sincronizar(self):
+        """Asegurar en disco los registros anotados en el diario"""
+        if self.diario is not None:
+            self.diario.sincronizar()
+
+    def importar(self, df):
+        """Incorporar en bloque los registros de otro historial"""
+        self.almacenamiento.importar(df)
+        self.cargar()
+
+    @property
+    def df(self):
+        """DataFrame ordenado por fecha con todos los registros"""
+        if self._pendientes:
+            self._consolidar()
+        return self._df
+
+    def rango(self, desde=None, hasta=None, margen=0):
+        """Registros entre dos fechas (incluidas), más `margen` registros a cada lado.
+
+        Como el historial está ordenado por fecha, la columna Fecha hace de
+        índice: basta una búsqueda binaria y se devuelve una vista del tramo.
+        """
+        df = self.df
+        fechas = df['Fecha'].to_numpy()
+        inicio = 0 if desde is None else np.searchsorted(fechas, np.datetime64(desde), side='left')
+        fin = len(df) if hasta is None else np.searchsorted(fechas, np.datetime64(hasta), side='right')
+        return df.iloc[max(inicio - margen, 0):min(fin + margen, len(df))]
+
+    def __len__(self):
+        return len(self._df) + len(self._pendientes)
+
+    @staticmethod
+    def _registro(fila):
+        registro = dict(zip(COLUMNAS, fila))
+        registro['Fecha'] = pd.to_datetime(registro['Fecha'], format=FORMATO_FECHA)
+        return registro
+
+    def _consolidar(self):
+        nuevos = aplicar_tipos(pd.DataFrame(self._pendientes, columns=COLUMNAS), referencia=self._df)
+        self._pendientes = []
+
+        if self._df.empty:
+            df = nuevos
+        else:
+            # Con las mismas categorías en ambos lados la concatenación las conserva
+            for columna in COLUMNAS_CATEGORICAS:
+                actual = self._df.get(columna)
+                if (actual is not None and isinstance(actual.dtype, pd.CategoricalDtype)
+                        and len(actual.cat.categories) != len(nuevos[columna].cat.categories)):
+                    self._df[columna] = actual.cat.set_categories(nuevos[columna].cat.categories)
+            ultima_fecha = self._df['Fecha'].iloc[-1]
+            df = pd.concat([self._df, nuevos], ignore_index=True)
+            # Lo normal es guardar con la fecha de hoy: solo se reordena si
+            # llega un registro anterior al último conocido
+            if nuevos['Fecha'].min() < ultima_fecha:
+                df.sort_values(by='Fecha', inplace=True, kind='mergesort')
+                df.reset_index(drop=True, inplace=True)
+                self.version_orden += 1
+
+        self._df = df
@@ -0,0 +1,584 @@
+"""Backends de almacenamiento del historial (CSV de texto o SQLite tipado)"""
+import csv
+import io
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from codificacion import ESCALAS
+from instrumentacion import contar, medido
+
+FORMATO_FECHA = '%d-%m-%Y'
+FORMATO_FECHA_ISO = '%Y-%m-%d'
+
+COLUMNAS = [
+    "Fecha", "Congestion", "Picor", "Dolor", "Secrecion",
+    "Dificultad_Respirar", "Tos", "Estornudos", "Erupciones",
+    "Urticaria", "Hinchazón", "Respibien_Suspendido",
+    "Utabon_Suspendido", "Otros_Medicamentos", "Dias_PostOp",
+    "Mejoria_Respiracion", "Notas"
+]
+
+COLUMNAS_NUMERICAS = ["Congestion", "Picor", "Estornudos", "Dias_PostOp"]
+# Columnas con vocabulario fijo (ver data_structure.md), en memoria como categorías
+COLUMNAS_CATEGORICAS = [columna for columna in COLUMNAS if columna in ESCALAS]
+
+# Tipo de cada columna al leer el CSV, para que pandas no tenga que deducirlo
+# (ni deducir uno distinto en cada lote). La fecha se lee como categoría y
+# solo se convierte una vez cada fecha distinta.
+TIPOS_CSV = {
+    "Fecha": "category",
+    **{columna: "float64" for columna in COLUMNAS_NUMERICAS},
+    **{columna: "category" for columna in COLUMNAS_CATEGORICAS},
+    "Otros_Medicamentos": str,
+    "Notas": str,
+}
+
+# Hasta 256 MB del archivo SQLite se leen mapeados en memoria
+MMAP_BYTES = 256 * 1024 * 1024
+
+# Registros por lote al recorrer el historial por partes
+TAMANO_LOTE = 500
+# Filas por bloque al comprobar solo las fechas de un CSV
+TAMANO_LOTE_FECHAS = 100_000
+
+
+def _ordenar(df):
+    # mergesort es estable: respeta el orden de guardado dentro del mismo día
+    df.sort_values(by='Fecha', inplace=True, kind='mergesort')
+    df.reset_index(drop=True, inplace=True)
+    return df
+
+
+def _firma_archivos(*rutas):
+    firma = []
+    for ruta in rutas:
+        if os.path.exists(ruta):
+            estado = os.stat(ruta)
+            firma.append([estado.st_size, estado.st_mtime_ns])
+    return firma
+
+
+def _resumen_vacio():
+    return {"registros": 0, "congestion_media": None, "picor_media": None,
+            "primera_fecha": None, "ultima_fecha": None}
+
+
+def _resumir_lotes(lotes):
+    # Resumen en una pasada, sin tener nunca más de un lote en memoria
+    registros = 0
+    # Como AVG en SQL, las medias solo cuentan los valores presentes
+    sumas = {"Congestion": 0.0, "Picor": 0.0}
+    valores = {"Congestion": 0, "Picor": 0}
+    primera = ultima = None
+    for lote in lotes:
+        if lote.empty:
+            continue
+        registros += len(lote)
+        for columna in sumas:
+            sumas[columna] += lote[columna].sum()
+            valores[columna] += lote[columna].count()
+        minimo, maximo = lote['Fecha'].min(), lote['Fecha'].max()
+        primera = minimo if primera is None else min(primera, minimo)
+        ultima = maximo if ultima is None else max(ultima, maximo)
+
+    if not registros:
+        return _resumen_vacio()
+    medias = {columna: sumas[columna] / valores[columna] if valores[columna] else None for columna in sumas}
+    return {"registros": registros,
+            "congestion_media": medias["Congestion"], "picor_media": medias["Picor"],
+            "primera_fecha": primera, "ultima_fecha": ultima}
+
+
+def _filtrar_rango(df, desde, hasta):
+    # Los registros son diarios: el rango abarca días completos
+    if desde is not None:
+        df = df[df['Fecha'] >= pd.Timestamp(desde).normalize()]
+    if hasta is not None:
+        df = df[df['Fecha'] <= pd.Timestamp(hasta)]
+    return df
+
+
+def aplicar_tipos(df, referencia=None):
+    """Convertir las columnas al esquema del historial.
+
+    Las categorías de cada columna son su vocabulario más cualquier otro
+    valor presente; con `referencia` se parte de las categorías de otro
+    DataFrame, de modo que ambos se puedan concatenar sin perder el tipo.
+    """
+    for columna in COLUMNAS_NUMERICAS:
+        if columna in df.columns:
+            df[columna] = pd.to_numeric(df[columna], errors='coerce').astype("float64")
+    for columna in COLUMNAS_CATEGORICAS:
+        if columna not in df.columns:
+            continue
+        if (referencia is not None and columna in referencia.columns
+                and isinstance(referencia[columna].dtype, pd.CategoricalDtype)):
+            categorias = list(referencia[columna].cat.categories)
+        else:
+            categorias = list(ESCALAS[columna])
+        serie = df[columna]
+        presentes = serie.cat.categories if isinstance(serie.dtype, pd.CategoricalDtype) else serie.dropna().unique()
+        conocidas = set(categorias)
+        categorias += [valor for valor in presentes if valor not in conocidas]
+        df[columna] = pd.Categorical(serie, categories=categorias)
+    return df
+
+
+@medido("carga.fechas")
+def _parsear_fechas(fechas, formato):
+    # Cada fecha distinta se convierte una sola vez (varios registros por día
+    # comparten la misma); las que no encajan en el formato quedan como NaT
+    if not isinstance(fechas.dtype, pd.CategoricalDtype):
+        fechas = fechas.astype("category")
+    unicas = pd.to_datetime(fechas.cat.categories, format=formato, errors='coerce')
+    codigos = fechas.cat.codes.to_numpy()
+    valores = unicas.to_numpy().take(codigos) if len(unicas) else codigos.astype('datetime64[ns]')
+    valores[codigos < 0] = np.datetime64('NaT')
+    return pd.Series(valores, index=fechas.index, name=fechas.name)
+
+
+def _validar_bloque(bloque, descartadas):
+    """Bloque con el esquema aplicado; las filas cuya fecha o cuyos números
+    no se pueden interpretar pasan a `descartadas`"""
+    fechas = _parsear_fechas(bloque['Fecha'], FORMATO_FECHA)
+    invalidas = fechas.isna()
+    for columna in COLUMNAS_NUMERICAS:
+        if columna in bloque.columns:
+            numeros = pd.to_numeric(bloque[columna], errors='coerce')
+            invalidas |= numeros.isna() & bloque[columna].notna()
+
+    if invalidas.any():
+        descartadas.extend(_filas_texto(bloque[invalidas]))
+        bloque, fechas = bloque[~invalidas].copy(), fechas[~invalidas]
+    bloque['Fecha'] = fechas
+    return aplicar_tipos(bloque)
+
+
+def _bloques_csv(ruta, columnas, tamano, descartadas):
+    """Leer el CSV por bloques con el esquema fijo.
+
+    Primero se intenta la lectura rápida (motor C con tipos explícitos). Si
+    el archivo tiene líneas mal formadas (campos de más, comillas sin cerrar,
+    números o fechas ilegibles), se vuelve a leer registro a registro,
+    apartando en `descartadas` esas líneas en lugar de fallar, y se continúa
+    tras los registros ya entregados. Con `columnas` solo se validan las
+    columnas leídas.
+    """
+    seleccion = None if columnas is None else set(columnas) | {"Fecha"}
+    usecols = None if seleccion is None else (lambda columna: columna in seleccion)
+    # Filas ya entregadas (o descartadas) por la lectura rápida
+    leidas = 0
+    try:
+        lector = pd.read_csv(ruta, usecols=usecols, dtype=TIPOS_CSV, chunksize=tamano, iterator=True)
+        for bloque in _leer_por_partes(lector, tamano):
+            leidas += len(bloque)
+            yield _validar_bloque(bloque, descartadas)
+        return
+    except (pd.errors.ParserError, ValueError, csv.Error):
+        pass
+
+    # Lectura tolerante: los registros bien formados se vuelven a pasar al
+    # lector de pandas, todo como texto, y cada campo se valida después
+    # Como en la lectura rápida, leyendo solo algunas columnas no se
+    # descartan los registros con campos de más
+    for registros, cabecera in _registros_csv(ruta, tamano or TAMANO_LOTE, descartadas,
+                                              recortar=usecols is not None):
+        if leidas:
+            saltar = min(leidas, len(registros))
+            registros, leidas = registros[saltar:], leidas - saltar
+        if not registros:
+            continue
+        texto = io.StringIO(newline='')
+        csv.writer(texto).writerows(registros)
+        texto.seek(0)
+        bloque = pd.read_csv(texto, header=None, names=cabecera, usecols=usecols, dtype=str)
+        yield _validar_bloque(bloque, descartadas)
+
+
+def _registros_csv(ruta, tamano, descartadas, recortar=False):
+    """Registros del CSV en listas de `tamano`, junto con la cabecera.
+
+    Los que traen campos de más van a `descartadas` (o se recortan, con
+    `recortar`). Si el módulo csv no
+    puede seguir (p. ej. una comilla sin cerrar, que se tragaría el resto del
+    archivo), ese registro y todo lo que le sigue se apartan como líneas sueltas.
+    """
+    with open(ruta, newline='', encoding='utf-8-sig') as file:
+        # Líneas del registro en curso, por si hay que apartarlo tal cual
+        lineas = []
+
+        def fuente():
+            for linea in file:
+                lineas.append(linea)
+                yield linea
+
+        lector = csv.reader(fuente(), strict=True)
+        cabecera, registros = None, []
+        while True:
+            lineas.clear()
+            try:
+                registro = next(lector)
+            except StopIteration:
+                break
+            except csv.Error:
+                descartadas.extend([linea.rstrip("\r\n")] for linea in lineas + list(file))
+                break
+            if not registro:
+                continue
+            if cabecera is None:
+                cabecera = registro
+            elif len(registro) > len(cabecera) and not recortar:
+                descartadas.append(registro)
+            else:
+                registros.append(registro[:len(cabecera)])
+                if len(registros) == tamano:
+                    yield registros, cabecera
+                    registros = []
+        if registros:
+            yield registros, cabecera
+
+
+def _leer_por_partes(lector, tamano):
+    # El lector se cierra aunque quien recorre los lotes pare antes del final
+    with lector:
+        if tamano is None:
+            yield lector.read()
+        else:
+            yield from lector
+
+
+def _filas_texto(df):
+    return df.astype(object).where(df.notna(), "").astype(str).values.tolist()
+
+
+def _poner_en_cuarentena(ruta, descartadas):
+    """Guardar aparte las líneas ilegibles del CSV para poder revisarlas"""
+    if not descartadas:
+        return
+    contar("carga.lineas_descartadas", len(descartadas))
+    ruta_cuarentena = ruta + ".cuarentena"
+    with open(ruta_cuarentena, mode='w', newline='', encoding='utf-8') as file:
+        csv.writer(file).writerows(descartadas)
+    print(f"⚠️ {ruta}: {len(descartadas)} líneas ilegibles apartadas en {ruta_cuarentena}")
+
+
+@medido("carga.csv")
+def leer_csv(ruta, columnas=None):
+    """Leer un CSV con el formato de registro_sintomas.csv (solo `columnas`,
+    además de la fecha, si se indican); las líneas ilegibles se apartan"""
+    descartadas = []
+    bloques = list(_bloques_csv(ruta, columnas, None, descartadas))
+    _poner_en_cuarentena(ruta, descartadas)
+    if not bloques:
+        # Todas las líneas eran ilegibles: historial vacío con el esquema
+        return aplicar_tipos(pd.DataFrame({"Fecha": pd.Series(dtype='datetime64[ns]')}).reindex(columns=COLUMNAS))
+    df = pd.concat(bloques, ignore_index=True) if len(bloques) > 1 else bloques[0]
+    return _ordenar(df)
+
+
+def _fechas_en_orden(ruta):
+    """(ordenado, última fecha): si las fechas legibles del CSV van en orden.
+
+    Solo se lee la columna Fecha; un archivo mal formado se da por
+    desordenado (la lectura tolerante y el ordenado en memoria se ocupan).
+    """
+    ultima = None
+    try:
+        lector = pd.read_csv(ruta, usecols=["Fecha"], dtype="category", chunksize=TAMANO_LOTE_FECHAS)
+        with lector:
+            for bloque in lector:
+                fechas = _parsear_fechas(bloque['Fecha'], FORMATO_FECHA).dropna()
+                if fechas.empty:
+                    continue
+                if not fechas.is_monotonic_increasing or (ultima is not None and fechas.iloc[0] < ultima):
+                    return False, None
+                ultima = fechas.iloc[-1]
+    except (pd.errors.ParserError, ValueError, csv.Error):
+        return False, None
+    return True, ultima
+
+
+def _para_csv(df):
+    salida = df.reindex(columns=COLUMNAS).copy()
+    salida['Fecha'] = salida['Fecha'].dt.strftime(FORMATO_FECHA)
+    # Las escalas se guardan como enteros, igual que las escribe el formulario
+    for columna in COLUMNAS_NUMERICAS:
+        valores = pd.to_numeric(salida[columna], errors='coerce')
+        if (valores.dropna() % 1 == 0).all():
+            salida[columna] = valores.astype("Int64")
+    return salida
+
+
+def escribir_csv(df, ruta):
+    """Escribir el historial en el formato CSV original"""
+    _para_csv(df).to_csv(ruta, index=False)
+
+
+class AlmacenamientoCSV:
+    """Historial en un único archivo CSV de texto (formato original)"""
+
+    tipo = "csv"
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        # (firma, ordenado, última fecha) de la última comprobación del orden
+        self._orden = None
+
+    def existe(self):
+        return os.path.exists(self.ruta)
+
+    def crear(self):
+        with open(self.ruta, mode='w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(COLUMNAS)
+
+    def leer(self, columnas=None):
+        return leer_csv(self.ruta, columnas)
+
+    def leer_lotes(self, desde=None, hasta=None, tamano=TAMANO_LOTE, columnas=None):
+        """Recorrer el CSV por lotes y en orden de fecha filtrando por fecha.
+
+        El formato de texto no tiene índice: el archivo se lee entero, pero
+        nunca hay más de un lote en memoria (ni más columnas que `columnas`).
+        Si el archivo no está ordenado (registros anteriores añadidos al final
+        o un CSV editado a mano), se ordena entero en memoria, como en leer().
+        """
+        if self._ordenado():
+            yield from self._lotes_archivo(desde, hasta, tamano, columnas)
+            return
+        lotes = list(self._lotes_archivo(desde, hasta, None, columnas))
+        if not lotes:
+            return
+        df = _ordenar(pd.concat(lotes, ignore_index=True) if len(lotes) > 1 else lotes[0])
+        paso = tamano or len(df)
+        for inicio in range(0, len(df), paso):
+            yield df.iloc[inicio:inicio + paso]
+
+    def _lotes_archivo(self, desde, hasta, tamano, columnas):
+        # Lotes en el orden del archivo
+        descartadas = []
+        for lote in _bloques_csv(self.ruta, columnas, tamano, descartadas):
+            lote = _filtrar_rango(lote, desde, hasta)
+            if not lote.empty:
+                yield lote
+        # Una lectura parcial no ve todas las columnas: solo aparta líneas la completa
+        if columnas is None:
+            _poner_en_cuarentena(self.ruta, descartadas)
+
+    def resumen(self, desde=None, hasta=None):
+        """Número de registros, medias y fechas extremas del rango"""
+        # Con todas las columnas, para descartar las mismas líneas que el informe
+        # (el orden no importa: no hace falta comprobarlo)
+        return _resumir_lotes(self._lotes_archivo(desde, hasta, TAMANO_LOTE, None))
+
+    def agregar(self, fila):
+        firma = self.firma()
+        with open(self.ruta, mode='a', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(fila)
+        self._anotar_fechas(firma, pd.to_datetime(pd.Series([fila[0]]), format=FORMATO_FECHA, errors='coerce'))
+
+    def importar(self, df):
+        """Añadir al final del CSV todos los registros de un DataFrame"""
+        salida = _para_csv(df)
+        # Un único write + fsync: si se interrumpe, el tamaño previo sirve
+        # como punto de restauración (ver diario.py)
+        bloque = salida.to_csv(header=False, index=False, lineterminator='\r\n').encode('utf-8')
+        firma = self.firma()
+        with open(self.ruta, mode='ab') as file:
+            file.write(bloque)
+            file.flush()
+            os.fsync(file.fileno())
+        self._anotar_fechas(firma, df['Fecha'])
+
+    def _ordenado(self):
+        # Solo se vuelven a leer las fechas si el archivo ha cambiado por otra vía
+        firma = self.firma()
+        if self._orden is None or self._orden[0] != firma:
+            self._orden = (firma, *_fechas_en_orden(self.ruta))
+        return self._orden[1]
+
+    def _anotar_fechas(self, firma, fechas):
+        # Registros añadidos al final: el orden ya comprobado se mantiene si
+        # ninguno es anterior al último del archivo (sin volver a leerlo)
+        if self._orden is None or self._orden[0] != firma:
+            return
+        _, ordenado, ultima = self._orden
+        fechas = fechas.dropna()
+        if ordenado and not fechas.empty:
+            ordenado = fechas.is_monotonic_increasing and (ultima is None or fechas.iloc[0] >= ultima)
+            ultima = fechas.iloc[-1]
+        self._orden = (self.firma(), ordenado, ultima)
+
+    def punto_restauracion(self):
+        """Tamaño actual del archivo, para deshacer una importación a medias"""
+        return os.path.getsize(self.ruta)
+
+    def restaurar(self, punto):
+        os.truncate(self.ruta, punto)
+
+    def firma(self):
+        """Tamaño y fecha de modificación del archivo: cambian con cada escritura"""
+        return _firma_archivos(self.ruta)
+
+
+class AlmacenamientoSQLite:
+    """Historial en SQLite con columnas tipadas e índice por fecha.
+
+    La fecha se guarda en ISO (aaaa-mm-dd), que ordena como texto y se
+    convierte a datetime mucho más rápido que el formato dd-mm-aaaa.
+    """
+
+    tipo = "sqlite"
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._columnas_sql = ", ".join(f'"{columna}"' for columna in COLUMNAS)
+        self._marcadores = ", ".join("?" for _ in COLUMNAS)
+
+    def existe(self):
+        return os.path.exists(self.ruta)
+
+    def _conectar(self):
+        con = sqlite3.connect(self.ruta)
+        con.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+        return closing(con)
+
+    def crear(self):
+        definiciones = []
+        for columna in COLUMNAS:
+            tipo = "INTEGER" if columna in COLUMNAS_NUMERICAS else "TEXT"
+            restriccion = " NOT NULL" if columna == "Fecha" else ""
+            definiciones.append(f'"{columna}" {tipo}{restriccion}')
+
+        with self._conectar() as con, con:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS registros ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                + ", ".join(definiciones) + ")"
+            )
+            con.execute('CREATE INDEX IF NOT EXISTS idx_registros_fecha ON registros ("Fecha")')
+
+    def _seleccion(self, columnas):
+        if columnas is None:
+            return self._columnas_sql
+        return ", ".join(f'"{columna}"' for columna in COLUMNAS
+                         if columna == "Fecha" or columna in columnas)
+
+    @medido("carga.sqlite")
+    def leer(self, columnas=None):
+        with self._conectar() as con:
+            df = pd.read_sql_query(
+                f'SELECT {self._seleccion(columnas)} FROM registros ORDER BY "Fecha", id', con
+            )
+        df['Fecha'] = _parsear_fechas(df['Fecha'], FORMATO_FECHA_ISO)
+        return aplicar_tipos(df)
+
+    def _condicion_rango(self, desde, hasta):
+        # Las fechas ISO se comparan como texto y aprovechan el índice
+        condiciones, parametros = [], []
+        if desde is not None:
+            condiciones.append('"Fecha" >= ?')
+            parametros.append(pd.Timestamp(desde).strftime(FORMATO_FECHA_ISO))
+        if hasta is not None:
+            condiciones.append('"Fecha" <= ?')
+            parametros.append(pd.Timestamp(hasta).strftime(FORMATO_FECHA_ISO))
+        where = (" WHERE " + " AND ".join(condiciones)) if condiciones else ""
+        return where, parametros
+
+    def leer_lotes(self, desde=None, hasta=None, tamano=TAMANO_LOTE, columnas=None):
+        """Recorrer por lotes y en orden de fecha solo los registros del rango
+        (y solo las `columnas` indicadas, además de la fecha)"""
+        where, parametros = self._condicion_rango(desde, hasta)
+        with self._conectar() as con:
+            lotes = pd.read_sql_query(
+                f'SELECT {self._seleccion(columnas)} FROM registros{where} ORDER BY "Fecha", id',
+                con, params=parametros, chunksize=tamano
+            )
+            for lote in lotes:
+                lote['Fecha'] = _parsear_fechas(lote['Fecha'], FORMATO_FECHA_ISO)
+                yield aplicar_tipos(lote)
+
+    def resumen(self, desde=None, hasta=None):
+        """Número de registros, medias y fechas extremas del rango (en SQL)"""
+        where, parametros = self._condicion_rango(desde, hasta)
+        with self._conectar() as con:
+            registros, congestion, picor, primera, ultima = con.execute(
+                'SELECT COUNT(*), AVG("Congestion"), AVG("Picor"), MIN("Fecha"), MAX("Fecha") '
+                f'FROM registros{where}', parametros
+            ).fetchone()
+        if not registros:
+            return _resumen_vacio()
+        return {"registros": registros,
+                "congestion_media": congestion, "picor_media": picor,
+                "primera_fecha": pd.Timestamp(primera), "ultima_fecha": pd.Timestamp(ultima)}
+
+    def agregar(self, fila):
+        valores = list(fila)
+        valores[0] = datetime.strptime(valores[0], FORMATO_FECHA).strftime(FORMATO_FECHA_ISO)
+        with self._conectar() as con, con:
+            con.execute(
+                f"INSERT INTO registros ({self._columnas_sql}) VALUES ({self._marcadores})",
+                valores
+            )
+
+    def importar(self, df):
+        """Insertar en bloque todos los registros de un DataFrame"""
+        datos = df.reindex(columns=COLUMNAS).copy()
+        datos['Fecha'] = datos['Fecha'].dt.strftime(FORMATO_FECHA_ISO)
+        datos = datos.astype(object).where(datos.notna(), None)
+        with self._conectar() as con, con:
+            con.executemany(
+                f"INSERT INTO registros ({self._columnas_sql}) VALUES ({self._marcadores})",
+                datos.itertuples(index=False, name=None)
+            )
+
+    def punto_restauracion(self):
+        """Último id insertado, para deshacer una importación posterior"""
+        with self._conectar() as con:
+            return con.execute("SELECT COALESCE(MAX(id), 0) FROM registros").fetchone()[0]
+
+    def restaurar(self, punto):
+        with self._conectar() as con, con:
+            con.execute("DELETE FROM registros WHERE id > ?", (punto,))
+
+    def firma(self):
+        """Tamaño y fecha de modificación de la base de datos (y de su WAL, si lo hay)"""
+        return _firma_archivos(self.ruta, self.ruta + "-wal")
+
+
+def migrar_csv_a_sqlite(ruta_csv, ruta_sqlite):
+    """Copiar una única vez el CSV existente a la base de datos SQLite"""
+    df = leer_csv(ruta_csv)
+    destino = AlmacenamientoSQLite(ruta_sqlite)
+    try:
+        destino.crear()
+        destino.importar(df)
+    except Exception:
+        # No dejar una base de datos a medias que impida reintentar la migración
+        if os.path.exists(ruta_sqlite):
+            os.remove(ruta_sqlite)
+        raise
+    return len(df)
+
+
+def crear_almacenamiento(tipo, ruta_csv, ruta_sqlite):
+    """Devolver el backend elegido, migrando el CSV la primera vez que se usa SQLite"""
+    if tipo == "csv":
+        almacenamiento = AlmacenamientoCSV(ruta_csv)
+    elif tipo == "sqlite":
+        almacenamiento = AlmacenamientoSQLite(ruta_sqlite)
+        if not almacenamiento.existe() and os.path.exists(ruta_csv):
+            total = migrar_csv_a_sqlite(ruta_csv, ruta_sqlite)
+            print(f"📦 Migrados {total} registros de {ruta_csv} a {ruta_sqlite}")
+    else:
+        raise ValueError(f"Tipo de almacenamiento desconocido: {tipo}")
+
+    if not almacenamiento.existe():
+        almacenamiento.crear()
+    return almacenamiento
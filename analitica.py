@@ -0,0 +1,165 @@
+"""Estadísticas móviles y tendencias de los síntomas, calculadas de forma incremental"""
+import numpy as np
+import pandas as pd
+
+from codificacion import codificar_columna
+
+# Síntomas analizados y su nombre para mostrar; el dolor se usa codificado (0-8)
+SINTOMAS = {
+    "Congestion": "Congestión",
+    "Picor": "Picor",
+    "Estornudos": "Estornudos",
+    "Dolor": "Dolor",
+}
+VENTANAS = (7, 30)
+# Cambio diario (en unidades de la escala) a partir del cual hay tendencia
+UMBRAL_TENDENCIA = 0.05
+
+
+class AnaliticaSintomas:
+    """Agregados diarios por síntoma (suma, número, mínimo y máximo).
+
+    Cada registro nuevo solo actualiza el agregado de su día, y las
+    ventanas de 7 y 30 días se resuelven consultando como mucho 30 días,
+    así que el coste no crece con la longitud del historial.
+    """
+
+    def __init__(self):
+        self.reiniciar()
+
+    def reiniciar(self):
+        # sintoma -> {día: [suma, n, mínimo, máximo]}
+        self._dias = {sintoma: {} for sintoma in SINTOMAS}
+        self._ultimo_dia = None
+        self._version = None
+        self._version_orden = None
+        self._procesados = 0
+
+    def agregar_lote(self, lote):
+        """Incorporar registros nuevos (en cualquier orden)"""
+        if lote.empty:
+            return
+        dias = lote['Fecha'].to_numpy().astype('datetime64[D]').astype(np.int64)
+        valores = pd.DataFrame({'Dia': dias}, index=lote.index)
+        for sintoma in SINTOMAS:
+            if sintoma == "Dolor":
+                valores[sintoma] = codificar_columna(lote, sintoma)
+            elif sintoma in lote.columns:
+                valores[sintoma] = pd.to_numeric(lote[sintoma], errors='coerce')
+
+        agregados = valores.groupby('Dia').agg(['sum', 'count', 'min', 'max'])
+        for sintoma in SINTOMAS:
+            if sintoma not in valores.columns:
+                continue
+            por_dia = self._dias[sintoma]
+            for dia, (suma, n, minimo, maximo) in zip(agregados.index, agregados[sintoma].to_numpy()):
+                if not n:
+                    continue
+                actual = por_dia.get(dia)
+                if actual is None:
+                    por_dia[dia] = [suma, n, minimo, maximo]
+                else:
+                    actual[0] += suma
+                    actual[1] += n
+                    actual[2] = min(actual[2], minimo)
+                    actual[3] = max(actual[3], maximo)
+
+        ultimo = int(dias.max())
+        self._ultimo_dia = ultimo if self._ultimo_dia is None else max(self._ultimo_dia, ultimo)
+
+    def sincronizar(self, almacen):
+        """Ponerse al día con un AlmacenSintomas procesando solo lo nuevo"""
+        df = almacen.df
+        if almacen.version_orden != self._version_orden:
+            # Historial recargado o reordenado: se rehace una sola vez
+            self.reiniciar()
+            self.agregar_lote(df)
+        elif almacen.version != self._version:
+            self.agregar_lote(df.iloc[self._procesados:])
+        self._version = almacen.version
+        self._version_orden = almacen.version_orden
+        self._procesados = len(df)
+
+    def medias_diarias(self):
+        """Media diaria de cada síntoma, con un valor (o NaN) por cada día del
+        rango (lo mismo que suspensiones.series_diarias, sin los registros)"""
+        medias = pd.DataFrame({
+            sintoma: pd.Series({dia: suma / n for dia, (suma, n, _, _) in por_dia.items()}, dtype=float)
+            for sintoma, por_dia in self._dias.items()
+        })
+        if medias.empty:
+            return medias
+        inicio, fin = int(medias.index.min()), int(medias.index.max())
+        medias = medias.reindex(range(inicio, fin + 1))
+        medias.index = pd.date_range(pd.Timestamp(np.datetime64(inicio, 'D')), periods=len(medias), freq='D')
+        return medias
+
+    def resumen(self, referencia=None, ventanas=VENTANAS):
+        """Estadísticas de cada síntoma en los últimos N días hasta `referencia`
+        (por defecto, el día del último registro).
+
+        Devuelve {sintoma: {ventana: {media, minimo, maximo, pendiente,
+        tendencia, dias}}}; las ventanas sin registros valen None.
+        """
+        if referencia is None:
+            fin = self._ultimo_dia
+        else:
+            fin = int(np.datetime64(pd.Timestamp(referencia).date(), 'D').astype(np.int64))
+
+        resultado = {}
+        for sintoma, por_dia in self._dias.items():
+            if not por_dia or fin is None:
+                continue
+            resultado[sintoma] = {
+                ventana: _estadisticas_ventana(por_dia, fin - ventana + 1, fin)
+                for ventana in ventanas
+            }
+        return resultado
+
+
+def _estadisticas_ventana(por_dia, inicio, fin):
+    dias = [dia for dia in range(inicio, fin + 1) if dia in por_dia]
+    if not dias:
+        return None
+
+    agregados = np.array([por_dia[dia] for dia in dias], dtype=float)
+    suma, n = agregados[:, 0].sum(), agregados[:, 1].sum()
+    medias_diarias = agregados[:, 0] / agregados[:, 1]
+    # Pendiente de la recta que mejor ajusta las medias diarias (unidades/día)
+    pendiente = float(np.polyfit(dias, medias_diarias, 1)[0]) if len(dias) > 1 else None
+    return {
+        "media": float(suma / n),
+        "minimo": float(agregados[:, 2].min()),
+        "maximo": float(agregados[:, 3].max()),
+        "pendiente": pendiente,
+        "tendencia": _tendencia(pendiente),
+        "dias": len(dias),
+    }
+
+
+def _tendencia(pendiente):
+    # Para los síntomas, que bajen es mejorar
+    if pendiente is None:
+        return "sin datos suficientes"
+    if pendiente <= -UMBRAL_TENDENCIA:
+        return "mejorando"
+    if pendiente >= UMBRAL_TENDENCIA:
+        return "empeorando"
+    return "estable"
+
+
+def describir_resumen(resumen):
+    """Una línea de texto por síntoma, para la interfaz y el informe"""
+    lineas = []
+    for sintoma, ventanas in resumen.items():
+        partes = []
+        for ventana, datos in ventanas.items():
+            if datos is None:
+                partes.append(f"{ventana} días: sin registros")
+            else:
+                partes.append(
+                    f"{ventana} días: media {datos['media']:.1f} "
+                    f"(mín {datos['minimo']:g}, máx {datos['maximo']:g}), {datos['tendencia']}"
+                )
+        lineas.append(f"{SINTOMAS[sintoma]} - " + " | ".join(partes))
+    return lineas
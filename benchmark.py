@@ -0,0 +1,277 @@
+"""Medición del rendimiento con historiales sintéticos de distintos tamaños
+
+Ejemplos:
+    python3 benchmark.py                                   # 1k, 10k y 100k registros
+    python3 benchmark.py --tamanos 1000 1000000 --guardar-referencia
+    python3 benchmark.py --referencia benchmark_referencia.json --tolerancia 0.3
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ETAPAS = ("carga", "codificacion", "grafico", "pdf")
+TAMANOS = (1_000, 10_000, 100_000)
+# El PDF incluye una fila por registro: por encima de este tamaño no se mide
+MAX_FILAS_PDF = 100_000
+REFERENCIA = "benchmark_referencia.json"
+# Margen sobre la referencia antes de considerar que algo ha empeorado
+TOLERANCIA = 0.25
+# Por debajo de estos valores el ruido de la medida pesa más que la diferencia
+MIN_SEGUNDOS = 0.05
+MIN_MEMORIA_MB = 1.0
+
+FRASES_NOTAS = [
+    "Noche con la nariz tapada, dormí con la boca abierta",
+    "Algo mejor por la mañana; por la tarde vuelve la congestión",
+    "Lavados nasales con suero, tres veces",
+    "Revisión con el otorrino: evolución normal, seguir igual",
+    "Picor de ojos al salir al parque, mucho polen hoy",
+    "Estornudos en serie al levantarme",
+    "Dolor de cabeza leve, sin fiebre",
+]
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        description="Mide carga, codificación, gráfico y PDF con historiales sintéticos."
+    )
+    parser.add_argument("--tamanos", nargs="+", type=int, default=list(TAMANOS),
+                        help="registros de cada historial generado (por defecto: 1000 10000 100000)")
+    parser.add_argument("--etapas", nargs="+", choices=ETAPAS, default=list(ETAPAS),
+                        help="qué medir (por defecto: todo)")
+    parser.add_argument("--repeticiones", type=int, default=3,
+                        help="veces que se repite cada medida; se toma la más rápida")
+    parser.add_argument("--max-filas-pdf", type=int, default=MAX_FILAS_PDF,
+                        help=f"no exportar PDF de historiales más grandes (por defecto: {MAX_FILAS_PDF})")
+    parser.add_argument("--carpeta", default=os.path.join(tempfile.gettempdir(), "mis_alergias_benchmark"),
+                        help="dónde se guardan (y reutilizan) los historiales generados")
+    parser.add_argument("--semilla", type=int, default=1234, help="semilla del generador")
+    parser.add_argument("--referencia", default=REFERENCIA,
+                        help=f"resultados de referencia con los que comparar (por defecto: {REFERENCIA})")
+    parser.add_argument("--guardar-referencia", action="store_true",
+                        help="guardar estos resultados como nueva referencia en lugar de comparar")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA,
+                        help="empeoramiento admitido respecto a la referencia (0.25 = 25 %%)")
+    parser.add_argument("--salida", help="guardar también los resultados en este JSON")
+    return parser
+
+
+def generar_historial(ruta, filas, semilla=1234):
+    """Escribir un registro_sintomas.csv sintético con `filas` registros.
+
+    Simula una recuperación: los síntomas bajan poco a poco con ruido, los
+    medicamentos se suspenden a mitad del historial, los días post-operatorios
+    avanzan y algunas notas son largas e incluyen comas y saltos de línea.
+    """
+    import numpy as np
+    import pandas as pd
+
+    from almacenamiento import COLUMNAS, escribir_csv
+    from codificacion import ESCALAS
+
+    rng = np.random.default_rng(semilla)
+    # Entre uno y tres registros por día, en orden
+    dias = np.cumsum(rng.random(filas) < 0.5)
+    fechas = pd.Timestamp("2020-01-01") + pd.to_timedelta(dias, unit="D")
+    progreso = np.linspace(0, 1, filas)
+
+    def escala(base):
+        valores = base * (1 - 0.7 * progreso) + rng.normal(0, 1.5, filas)
+        return np.clip(np.round(valores), 0, 10).astype(int)
+
+    def opciones(columna, pesos_inicio, pesos_fin):
+        vocabulario = list(ESCALAS[columna])
+        # Probabilidades que pasan de pesos_inicio a pesos_fin a lo largo del historial
+        inicio, fin = np.array(pesos_inicio, float), np.array(pesos_fin, float)
+        probabilidades = np.outer(1 - progreso, inicio / inicio.sum()) + np.outer(progreso, fin / fin.sum())
+        elegidos = (probabilidades.cumsum(axis=1) < rng.random((filas, 1))).sum(axis=1)
+        return np.array(vocabulario)[np.minimum(elegidos, len(vocabulario) - 1)]
+
+    def suspension(desde):
+        # "no" hasta la suspensión; después, los días transcurridos crecen
+        transcurridos = dias - dias[int(filas * desde)]
+        return np.select(
+            [transcurridos < 0, transcurridos == 0, transcurridos == 1, transcurridos <= 3],
+            ["no", "sí - hoy", "sí - hace 1 día", "sí - hace 2-3 días"],
+            "sí - hace >3 días"
+        )
+
+    largas = rng.random(filas) < 0.05
+    notas = np.where(rng.random(filas) < 0.4, "", np.array(FRASES_NOTAS)[rng.integers(0, len(FRASES_NOTAS), filas)])
+    notas = np.where(largas, np.char.add(notas, ", y además:\n" + "; ".join(FRASES_NOTAS)), notas)
+
+    df = pd.DataFrame({
+        "Fecha": fechas,
+        "Congestion": escala(8),
+        "Picor": escala(6),
+        "Dolor": opciones("Dolor", [2, 4, 3, 1], [8, 2, 0.5, 0.1]),
+        "Secrecion": opciones("Secrecion", [2, 3, 3, 1], [8, 2, 0.5, 0.1]),
+        "Dificultad_Respirar": opciones("Dificultad_Respirar", [2, 4, 3, 1], [8, 2, 0.5, 0.1]),
+        "Tos": opciones("Tos", [3, 3, 2, 1], [8, 2, 0.5, 0.1]),
+        "Estornudos": escala(5),
+        "Erupciones": opciones("Erupciones", [5, 3, 1, 0.5], [9, 1, 0.1, 0.1]),
+        "Urticaria": opciones("Urticaria", [5, 3, 1], [9, 1, 0.1]),
+        "Hinchazón": opciones("Hinchazón", [6, 2, 1, 0.5], [9, 1, 0.1, 0.1]),
+        "Respibien_Suspendido": suspension(0.3),
+        "Utabon_Suspendido": suspension(0.5),
+        "Otros_Medicamentos": np.where(rng.random(filas) < 0.2, "ibuprofeno 400 mg", ""),
+        "Dias_PostOp": dias,
+        "Mejoria_Respiracion": opciones("Mejoria_Respiracion", [3, 4, 2, 0.5], [0.2, 2, 4, 4]),
+        "Notas": notas,
+    }, columns=COLUMNAS)
+    escribir_csv(df, ruta)
+    return ruta
+
+
+def historial_de_prueba(carpeta, filas, semilla):
+    """Ruta del historial sintético de `filas` registros, generándolo si no existe"""
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, f"registro_sintomas_{filas}_{semilla}.csv")
+    if not os.path.exists(ruta):
+        inicio = time.perf_counter()
+        generar_historial(ruta, filas, semilla)
+        print(f"🧪 Generado {ruta} ({time.perf_counter() - inicio:.1f} s)")
+    return ruta
+
+
+def medir(funcion, repeticiones):
+    """Mejor tiempo de `repeticiones` ejecuciones y pico de memoria de una más
+    bajo tracemalloc (que ralentiza, por eso no se cronometra)"""
+    mejor = None
+    for _ in range(max(1, repeticiones)):
+        gc.collect()
+        inicio = time.perf_counter()
+        funcion()
+        transcurrido = time.perf_counter() - inicio
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return mejor, pico / (1024 * 1024)
+
+
+def medir_historial(ruta, filas, etapas, repeticiones, max_filas_pdf):
+    """Medidas de cada etapa para un historial: {etapa: {segundos, registros_s, memoria_mb}}"""
+    from almacenamiento import AlmacenamientoCSV, leer_csv
+    from codificacion import codificar_ordinales
+    from exportacion import exportar_informe
+    from graficos import MAX_PUNTOS_PANTALLA, dibujar, figura_offscreen, preparar_series
+
+    df = leer_csv(ruta)
+    series = preparar_series(df)
+
+    def grafico():
+        figura = figura_offscreen()
+        dibujar(figura, series.reducir(MAX_PUNTOS_PANTALLA))
+        figura.canvas.draw()
+
+    carpeta_pdf = tempfile.mkdtemp(prefix="informes_", dir=os.path.dirname(ruta))
+    pruebas = {
+        "carga": lambda: leer_csv(ruta),
+        "codificacion": lambda: (codificar_ordinales(df), preparar_series(df)),
+        "grafico": grafico,
+        "pdf": lambda: exportar_informe(AlmacenamientoCSV(ruta), carpeta_pdf, cache=False),
+    }
+
+    resultados = {}
+    try:
+        for etapa in etapas:
+            if etapa == "pdf" and filas > max_filas_pdf:
+                continue
+            segundos, memoria = medir(pruebas[etapa], repeticiones)
+            resultados[etapa] = {
+                "segundos": round(segundos, 4),
+                "registros_s": round(filas / segundos) if segundos else None,
+                "memoria_mb": round(memoria, 1),
+            }
+    finally:
+        shutil.rmtree(carpeta_pdf, ignore_errors=True)
+    return resultados
+
+
+def comparar(resultados, referencia, tolerancia):
+    """Lista de empeoramientos respecto a la referencia (vacía si no hay)"""
+    regresiones = []
+    for filas, etapas in resultados.items():
+        for etapa, actual in etapas.items():
+            anterior = referencia.get(filas, {}).get(etapa)
+            if anterior is None:
+                continue
+            for medida, minimo, unidad in (("segundos", MIN_SEGUNDOS, "s"), ("memoria_mb", MIN_MEMORIA_MB, "MB")):
+                limite = max(anterior[medida], minimo) * (1 + tolerancia)
+                if actual[medida] > limite:
+                    regresiones.append(
+                        f"{etapa} con {int(filas):,} registros: {actual[medida]:g} {unidad} "
+                        f"(referencia {anterior[medida]:g} {unidad})"
+                    )
+    return regresiones
+
+
+def imprimir_tabla(resultados, referencia):
+    print(f"\n{'Registros':>10}  {'Etapa':<13}{'Tiempo':>10}{'Registros/s':>14}{'Memoria':>11}{'Referencia':>13}")
+    for filas, etapas in resultados.items():
+        for etapa, medida in etapas.items():
+            anterior = referencia.get(filas, {}).get(etapa)
+            comparacion = f"{medida['segundos'] / anterior['segundos']:.2f}x" if anterior and anterior['segundos'] else "-"
+            print(f"{int(filas):>10,}  {etapa:<13}{medida['segundos']:>9.3f}s{medida['registros_s'] or 0:>14,}"
+                  f"{medida['memoria_mb']:>8.1f} MB{comparacion:>13}")
+
+
+def main(argumentos=None):
+    args = crear_parser().parse_args(argumentos)
+
+    resultados = {}
+    for filas in args.tamanos:
+        ruta = historial_de_prueba(args.carpeta, filas, args.semilla)
+        print(f"⏱️ Midiendo {filas:,} registros...")
+        resultados[str(filas)] = medir_historial(ruta, filas, args.etapas, args.repeticiones, args.max_filas_pdf)
+
+    referencia = {}
+    if not args.guardar_referencia and os.path.exists(args.referencia):
+        with open(args.referencia, encoding='utf-8') as f:
+            referencia = json.load(f)["resultados"]
+    imprimir_tabla(resultados, referencia)
+
+    datos = {
+        "fecha": datetime.now().strftime('%d-%m-%Y %H:%M'),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "resultados": resultados,
+    }
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, indent=2, ensure_ascii=False)
+    if args.guardar_referencia:
+        with open(args.referencia, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, indent=2, ensure_ascii=False)
+        print(f"\n📌 Referencia guardada en {args.referencia}")
+        return 0
+    if not referencia:
+        print(f"\nℹ️ Sin referencia con la que comparar ({args.referencia}); usa --guardar-referencia")
+        return 0
+
+    regresiones = comparar(resultados, referencia, args.tolerancia)
+    if regresiones:
+        print(f"\n❌ Empeoramientos de más del {args.tolerancia:.0%} respecto a la referencia:", file=sys.stderr)
+        for regresion in regresiones:
+            print(f"   {regresion}", file=sys.stderr)
+        return 1
+    print(f"\n✅ Sin empeoramientos respecto a la referencia ({args.tolerancia:.0%} de margen)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
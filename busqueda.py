@@ -0,0 +1,237 @@
+"""Búsqueda en las notas y los medicamentos, con filtros por columna
+
+Una consulta mezcla palabras y condiciones, y un registro tiene que
+cumplirlas todas:
+
+    ibuprofeno                      notas u otros medicamentos con "ibuprofeno..."
+    Urticaria != no Congestion >= 7
+    Notas: cansancio Fecha >= 01-05-2025
+    Respibien_Suspendido = "sí - hoy"
+
+Las palabras se comparan sin mayúsculas ni tildes y por prefijo ("ibupro"
+encuentra "ibuprofeno"). En las columnas de escala (Dolor, Urticaria...)
+los valores se ordenan como en el formulario, así que "Dolor >= moderado"
+incluye "severo".
+
+Ejemplo sin interfaz:
+    python3 busqueda.py registro_sintomas.db "ibuprofeno Congestion >= 7"
+"""
+import argparse
+import bisect
+import operator
+import re
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from almacenamiento import COLUMNAS, COLUMNAS_NUMERICAS, FORMATO_FECHA
+from codificacion import ESCALAS, codigos_columna
+from instrumentacion import medido, medir
+
+# Columnas de texto libre que se indexan palabra por palabra
+COLUMNAS_TEXTO = ["Otros_Medicamentos", "Notas"]
+# Registros que se devuelven como mucho (los más recientes primero)
+LIMITE_RESULTADOS = 500
+
+OPERADORES = {
+    "=": operator.eq, "!=": operator.ne,
+    ">=": operator.ge, "<=": operator.le,
+    ">": operator.gt, "<": operator.lt,
+}
+_CONDICION = re.compile(r'(\w+)\s*(>=|<=|!=|=|>|<|:)\s*("[^"]*"|\'[^\']*\'|\S+)')
+_PALABRA = re.compile(r"\w+")
+_TILDES = re.compile("[\u0300-\u036f]")
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes (la ñ queda como n)"""
+    import unicodedata
+    return _TILDES.sub("", unicodedata.normalize("NFKD", texto.lower()))
+
+
+# Nombre de columna tal como se escribe en la consulta -> nombre real
+_NOMBRES = {normalizar(columna): columna for columna in COLUMNAS}
+
+
+class IndiceBusqueda:
+    """Índice invertido (palabra -> posiciones en el historial) de las
+    columnas de texto libre.
+
+    Como el de las tendencias, se mantiene al día de forma incremental: los
+    registros añadidos al final solo indexan sus propias palabras, y solo se
+    rehace entero si el historial se recarga o se reordena. Cada historial
+    abierto necesita su propio índice.
+    """
+
+    def __init__(self):
+        self.reiniciar()
+
+    def reiniciar(self):
+        # columna -> {palabra: [arrays de posiciones]}
+        self._palabras = {columna: {} for columna in COLUMNAS_TEXTO}
+        # columna -> palabras ordenadas, para buscar por prefijo (None = por rehacer)
+        self._vocabulario = {columna: None for columna in COLUMNAS_TEXTO}
+        self._version_orden = None
+        self._version = None
+        self._procesados = 0
+
+    @medido("busqueda.indexar")
+    def agregar_lote(self, lote, inicio):
+        """Indexar registros que ocupan las posiciones desde `inicio`"""
+        if lote.empty:
+            return
+        for columna in COLUMNAS_TEXTO:
+            if columna not in lote.columns:
+                continue
+            # Los textos se repiten mucho (el mismo medicamento día tras día):
+            # cada texto distinto se trocea una sola vez
+            codigos, textos = pd.factorize(lote[columna])
+            orden = np.argsort(codigos, kind='stable')
+            limites = np.searchsorted(codigos[orden], np.arange(len(textos) + 1))
+            indice = self._palabras[columna]
+            for numero, texto in enumerate(textos):
+                filas = orden[limites[numero]:limites[numero + 1]] + inicio
+                for palabra in set(_PALABRA.findall(normalizar(str(texto)))):
+                    indice.setdefault(palabra, []).append(filas)
+            self._vocabulario[columna] = None
+
+    def sincronizar(self, almacen):
+        """Ponerse al día con un AlmacenSintomas indexando solo lo nuevo"""
+        df = almacen.df
+        if almacen.version_orden != self._version_orden or len(df) < self._procesados:
+            self.reiniciar()
+            self.agregar_lote(df, 0)
+        elif almacen.version != self._version:
+            self.agregar_lote(df.iloc[self._procesados:], self._procesados)
+        self._version_orden = almacen.version_orden
+        self._version = almacen.version
+        self._procesados = len(df)
+
+    def posiciones(self, prefijo, columnas=COLUMNAS_TEXTO):
+        """Posiciones de los registros con alguna palabra que empiece por `prefijo`"""
+        encontradas = []
+        for columna in columnas:
+            vocabulario = self._vocabulario[columna]
+            if vocabulario is None:
+                vocabulario = self._vocabulario[columna] = sorted(self._palabras[columna])
+            desde = bisect.bisect_left(vocabulario, prefijo)
+            hasta = bisect.bisect_left(vocabulario, prefijo + "\uffff")
+            indice = self._palabras[columna]
+            for palabra in vocabulario[desde:hasta]:
+                partes = indice[palabra]
+                if len(partes) > 1:
+                    # Se juntan la primera vez que se consultan
+                    partes[:] = [np.concatenate(partes)]
+                encontradas.append(partes[0])
+        if not encontradas:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(encontradas)
+
+    def buscar(self, almacen, consulta, limite=LIMITE_RESULTADOS):
+        """Registros que cumplen la consulta, del más reciente al más antiguo.
+
+        Devuelve (total, DataFrame con como mucho `limite` registros); lanza
+        ValueError si la consulta no se entiende.
+        """
+        with medir("busqueda.consulta"):
+            self.sincronizar(almacen)
+            df = almacen.df
+            coincide = self._filtrar(df, consulta)
+            posiciones = np.flatnonzero(coincide)[::-1]
+            return len(posiciones), df.iloc[posiciones[:limite]]
+
+    def _filtrar(self, df, consulta):
+        coincide = np.ones(len(df), dtype=bool)
+        for columna, simbolo, valor in _CONDICION.findall(consulta):
+            coincide &= self._condicion(df, columna, simbolo, valor.strip("\"'"))
+        for palabra in _PALABRA.findall(normalizar(_CONDICION.sub(" ", consulta))):
+            coincide &= self._mascara(palabra, len(df))
+        return coincide
+
+    def _mascara(self, palabra, filas, columnas=COLUMNAS_TEXTO):
+        mascara = np.zeros(filas, dtype=bool)
+        mascara[self.posiciones(palabra, columnas)] = True
+        return mascara
+
+    def _condicion(self, df, nombre, simbolo, valor):
+        columna = _NOMBRES.get(normalizar(nombre))
+        if columna is None:
+            raise ValueError(f"No existe la columna «{nombre}»")
+        comparar = OPERADORES.get(simbolo)
+
+        if columna in COLUMNAS_TEXTO:
+            if simbolo not in (":", "=", "!="):
+                raise ValueError(f"En {columna} solo se puede buscar texto (con «:», «=» o «!=»)")
+            mascara = np.ones(len(df), dtype=bool)
+            for palabra in _PALABRA.findall(normalizar(valor)):
+                mascara &= self._mascara(palabra, len(df), [columna])
+            return ~mascara if simbolo == "!=" else mascara
+
+        if comparar is None:
+            raise ValueError(f"«{columna}» no es de texto libre: usa =, !=, <, <=, > o >=")
+        if columna == "Fecha":
+            try:
+                fecha = datetime.strptime(valor, FORMATO_FECHA)
+            except ValueError:
+                raise ValueError(f"Fecha no válida: {valor} (formato DD-MM-AAAA)")
+            dias = df['Fecha'].to_numpy().astype('datetime64[D]')
+            return comparar(dias, np.datetime64(fecha.date(), 'D'))
+        if columna in COLUMNAS_NUMERICAS:
+            try:
+                numero = float(valor.replace(",", "."))
+            except ValueError:
+                raise ValueError(f"{columna} es numérica: «{valor}» no es un número")
+            serie = pd.to_numeric(df[columna], errors='coerce').to_numpy()
+            return ~np.isnan(serie) & comparar(serie, numero)
+
+        # Columnas de escala: se compara la posición del valor en el formulario
+        opciones = [normalizar(opcion) for opcion in ESCALAS[columna]]
+        if normalizar(valor) not in opciones:
+            raise ValueError(f"Valor no válido para {columna}: «{valor}» "
+                             f"(opciones: {', '.join(ESCALAS[columna])})")
+        codigos = codigos_columna(df, columna)
+        return (codigos >= 0) & comparar(codigos, opciones.index(normalizar(valor)))
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Busca registros en un historial de síntomas.")
+    parser.add_argument("archivo", help="historial (registro_sintomas.csv o .db)")
+    parser.add_argument("consulta", help='p. ej. "ibuprofeno Urticaria != no Congestion >= 7"')
+    parser.add_argument("--limite", type=int, default=20, help="registros que se muestran (por defecto: 20)")
+    return parser
+
+
+def main(argumentos=None):
+    from almacen import AlmacenSintomas
+    from cli import abrir_historial
+
+    args = crear_parser().parse_args(argumentos)
+    almacen = AlmacenSintomas(abrir_historial(args.archivo))
+    almacen.cargar()
+
+    indice = IndiceBusqueda()
+    inicio = time.perf_counter()
+    indice.sincronizar(almacen)
+    indexado = time.perf_counter()
+    try:
+        total, resultados = indice.buscar(almacen, args.consulta, args.limite)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    fin = time.perf_counter()
+
+    print(f"🔎 {total} registros de {len(almacen)} (índice {(indexado - inicio) * 1000:.0f} ms, "
+          f"búsqueda {(fin - indexado) * 1000:.1f} ms)")
+    for _, registro in resultados.iterrows():
+        texto = " · ".join(str(registro[columna]) for columna in COLUMNAS_TEXTO
+                           if pd.notna(registro[columna]) and str(registro[columna]))
+        print(f"   {registro['Fecha'].strftime(FORMATO_FECHA)}  congestión {registro['Congestion']:g}  "
+              f"picor {registro['Picor']:g}  {texto}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Exportación por lotes sin interfaz gráfica (no necesita pantalla ni Qt)
+
+Ejemplos:
+    python3 cli.py pacientes/*/registro_sintomas.csv --salida informes
+    python3 cli.py registro_sintomas.db --formatos pdf png --desde 01-01-2025
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+FORMATOS = ("pdf", "png", "resumen")
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        description="Genera informes de uno o varios historiales de síntomas sin abrir la aplicación."
+    )
+    parser.add_argument("archivos", nargs="+",
+                        help="historiales a procesar (registro_sintomas.csv o .db)")
+    parser.add_argument("--salida", default="reportes",
+                        help="carpeta de destino; cada historial tiene su subcarpeta (por defecto: reportes)")
+    parser.add_argument("--formatos", nargs="+", choices=FORMATOS, default=["pdf", "resumen"],
+                        help="qué generar: pdf, png (solo gráficos) y/o resumen (resumen.csv común)")
+    parser.add_argument("--desde", type=leer_fecha, help="primer día incluido (DD-MM-AAAA)")
+    parser.add_argument("--hasta", type=leer_fecha, help="último día incluido (DD-MM-AAAA)")
+    parser.add_argument("--grafico", choices=("png", "svg"), default="png",
+                        help="cómo se incrusta el gráfico en el PDF (por defecto: png; svg es vectorial pero más lento)")
+    parser.add_argument("--dpi", type=int, default=150, help="resolución de los gráficos rasterizados")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count(),
+                        help="historiales procesados en paralelo (por defecto: uno por CPU)")
+    return parser
+
+
+def leer_fecha(texto):
+    try:
+        return datetime.strptime(texto, "%d-%m-%Y")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"fecha no válida: {texto} (formato DD-MM-AAAA)")
+
+
+def abrir_historial(ruta):
+    """Backend de almacenamiento según la extensión (sin crear ni migrar nada),
+    con su diario de escrituras ya volcado"""
+    from almacenamiento import AlmacenamientoCSV, AlmacenamientoSQLite
+    from diario import DiarioEscrituras, ruta_diario
+
+    if not os.path.exists(ruta):
+        raise FileNotFoundError(f"No existe el archivo {ruta}")
+    if ruta.lower().endswith((".db", ".sqlite")):
+        almacenamiento = AlmacenamientoSQLite(ruta)
+    else:
+        almacenamiento = AlmacenamientoCSV(ruta)
+
+    # Registros guardados por la aplicación que aún están solo en el diario
+    if os.path.exists(ruta_diario(ruta)):
+        DiarioEscrituras(almacenamiento, ruta_diario(ruta)).compactar()
+    return almacenamiento
+
+
+def nombres_de_salida(archivos):
+    """Nombre de subcarpeta para cada historial; como suelen llamarse todos
+    registro_sintomas.csv, se usa la carpeta que los contiene"""
+    nombres = {}
+    usados = set()
+    for ruta in archivos:
+        carpeta = os.path.basename(os.path.dirname(os.path.abspath(ruta)))
+        base = os.path.splitext(os.path.basename(ruta))[0]
+        nombre = f"{carpeta}_{base}" if carpeta else base
+        candidato, numero = nombre, 2
+        while candidato in usados:
+            candidato, numero = f"{nombre}_{numero}", numero + 1
+        usados.add(candidato)
+        nombres[ruta] = candidato
+    return nombres
+
+
+def procesar_historial(ruta, carpeta, formatos, desde, hasta, grafico, dpi):
+    """Generar los formatos pedidos para un historial (se ejecuta en un proceso aparte)"""
+    from exportacion import exportar_grafico, exportar_informe
+
+    inicio = time.perf_counter()
+    almacenamiento = abrir_historial(ruta)
+    resumen = almacenamiento.resumen(desde, hasta)
+    resultado = {"archivo": ruta, **resumen}
+
+    if resumen["registros"]:
+        if "pdf" in formatos:
+            resultado["pdf"] = exportar_informe(almacenamiento, carpeta, desde, hasta,
+                                                formato_grafico=grafico, dpi=dpi)
+        if "png" in formatos:
+            os.makedirs(carpeta, exist_ok=True)
+            resultado["png"] = exportar_grafico(
+                almacenamiento, os.path.join(carpeta, "grafico_sintomas.png"), desde, hasta, dpi=dpi
+            )
+    resultado["segundos"] = round(time.perf_counter() - inicio, 2)
+    return resultado
+
+
+def guardar_resumen(resultados, ruta):
+    import pandas as pd
+
+    columnas = ["archivo", "registros", "primera_fecha", "ultima_fecha",
+                "congestion_media", "picor_media", "pdf", "png", "segundos"]
+    df = pd.DataFrame(resultados).reindex(columns=columnas)
+    for columna in ("primera_fecha", "ultima_fecha"):
+        df[columna] = pd.to_datetime(df[columna]).dt.strftime("%d-%m-%Y")
+    df.round({"congestion_media": 2, "picor_media": 2}).to_csv(ruta, index=False)
+
+
+def main(argumentos=None):
+    args = crear_parser().parse_args(argumentos)
+    nombres = nombres_de_salida(args.archivos)
+    resultados = []
+    errores = 0
+
+    procesos = max(1, min(args.procesos or 1, len(args.archivos)))
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        tareas = {
+            pool.submit(procesar_historial, ruta, os.path.join(args.salida, nombres[ruta]),
+                        args.formatos, args.desde, args.hasta, args.grafico, args.dpi): ruta
+            for ruta in args.archivos
+        }
+        for tarea in as_completed(tareas):
+            ruta = tareas[tarea]
+            try:
+                resultado = tarea.result()
+            except Exception as e:
+                errores += 1
+                print(f"❌ {ruta}: {e}", file=sys.stderr)
+                continue
+            resultados.append(resultado)
+            if resultado["registros"]:
+                print(f"✅ {ruta}: {resultado['registros']} registros ({resultado['segundos']} s)")
+            else:
+                print(f"⚠️ {ruta}: sin registros en el periodo")
+
+    if "resumen" in args.formatos and resultados:
+        os.makedirs(args.salida, exist_ok=True)
+        ruta_resumen = os.path.join(args.salida, "resumen.csv")
+        guardar_resumen(sorted(resultados, key=lambda r: r["archivo"]), ruta_resumen)
+        print(f"📊 Resumen: {ruta_resumen}")
+
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Conversión vectorizada de las columnas categóricas a valores numéricos"""
+import numpy as np
+import pandas as pd
+
+from instrumentacion import medido
+
+SUSPENSION = {
+    "no": 0,
+    "sí - hoy": 0,
+    "sí - hace 1 día": 1,
+    "sí - hace 2-3 días": 2.5,
+    "sí - hace >3 días": 5,
+}
+
+# Valor numérico de cada opción, en el orden en que aparecen en el formulario
+# (ver data_structure.md). Lo que no esté en la tabla se codifica como 0.
+ESCALAS = {
+    "Dolor": {"no": 0, "leve": 2, "moderado": 5, "severo": 8},
+    "Secrecion": {"no": 0, "clara": 1, "espesa": 2, "sanguinolenta": 3},
+    "Dificultad_Respirar": {"no": 0, "leve": 1, "moderada": 2, "severa": 3},
+    "Tos": {"no": 0, "seca": 1, "con flemas": 2, "persistente": 3},
+    "Erupciones": {"no": 0, "leves": 1, "moderadas": 2, "severas": 3},
+    "Urticaria": {"no": 0, "localizada": 1, "generalizada": 2},
+    "Hinchazón": {"no": 0, "facial": 1, "labios/ojos": 2, "generalizada": 3},
+    "Respibien_Suspendido": SUSPENSION,
+    "Utabon_Suspendido": SUSPENSION,
+    "Mejoria_Respiracion": {"empeorando": -1, "sin cambios": 0, "ligeramente mejor": 1, "mucho mejor": 2},
+}
+
+# Tablas de búsqueda precalculadas: categorías y valores (+ 0 para desconocidos)
+_TABLAS = {
+    columna: (pd.Index(list(escala)), np.array(list(escala.values()) + [0], dtype=float))
+    for columna, escala in ESCALAS.items()
+}
+
+
+@medido("codificacion.columna")
+def codificar_columna(df, columna):
+    """Devolver la columna categórica como serie numérica (ceros si no existe)"""
+    if columna not in df.columns:
+        return pd.Series(0.0, index=df.index)
+
+    categorias, valores = _TABLAS[columna]
+    # Los códigos de categoría valen -1 para valores desconocidos o vacíos,
+    # que apuntan al 0 añadido al final de la tabla
+    codigos = _codigos(df[columna], categorias)
+    return pd.Series(valores[codigos], index=df.index)
+
+
+def codigos_columna(df, columna):
+    """Posición de cada valor dentro de su escala (-1 si es desconocido o falta)"""
+    if columna not in df.columns:
+        return np.full(len(df), -1, dtype=np.int8)
+
+    return _codigos(df[columna], _TABLAS[columna][0])
+
+
+def _codigos(serie, categorias):
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        if serie.cat.categories.empty:
+            return np.full(len(serie), -1, dtype=np.int8)  # Todo vacío
+        # Columna ya categórica: basta normalizar cada categoría una vez
+        por_categoria = _codigos(pd.Series(serie.cat.categories), categorias)
+        codigos = serie.cat.codes.to_numpy()
+        return np.where(codigos >= 0, por_categoria[codigos], -1).astype(np.int8)
+    textos = serie.astype(str).str.strip().str.lower()
+    return pd.Categorical(textos, categories=categorias).codes
+
+
+def codificar_ordinales(df):
+    """Codificar de una vez todas las columnas ordinales del registro"""
+    return pd.DataFrame(
+        {columna: codificar_columna(df, columna) for columna in ESCALAS},
+        index=df.index
+    )
@@ -0,0 +1,190 @@
+"""Diario de escrituras: registros nuevos a salvo de cortes antes de llegar al almacenamiento"""
+import json
+import os
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Registros escritos entre dos fsync (el resto de veces basta con el write)
+LOTE_FSYNC = 8
+# A partir de cuántos registros en el diario se vuelcan al almacenamiento
+UMBRAL_COMPACTACION = 50
+
+
+def ruta_diario(ruta_almacenamiento):
+    return ruta_almacenamiento + ".diario"
+
+
+def _codificar(fila):
+    datos = json.dumps(list(fila), ensure_ascii=False).encode('utf-8')
+    return b"%08x %s\n" % (zlib.crc32(datos), datos)
+
+
+def _decodificar(linea):
+    """Fila de una línea completa del diario, o None si está dañada"""
+    try:
+        crc, datos = linea.rstrip(b"\n").split(b" ", 1)
+        if int(crc, 16) != zlib.crc32(datos):
+            return None
+        return json.loads(datos)
+    except ValueError:
+        return None
+
+
+class DiarioEscrituras:
+    """Registros pendientes de volcar, uno por línea con su CRC32.
+
+    Cada registro se añade con un único write en modo append y bajo un
+    bloqueo de archivo, así que dos instancias no pueden intercalar líneas.
+    Al leer se descarta la cola dañada (una escritura cortada a medias) y
+    se conserva todo lo anterior. La compactación vuelca el diario al
+    almacenamiento anotando antes un punto de restauración: si se
+    interrumpe, la siguiente apertura deshace el volcado parcial y el
+    diario se vuelve a aplicar, de modo que ningún registro se pierde ni
+    se duplica.
+    """
+
+    def __init__(self, almacenamiento, ruta, lote_fsync=LOTE_FSYNC):
+        self.almacenamiento = almacenamiento
+        self.ruta = ruta
+        self.ruta_compactando = ruta + ".compactando"
+        self.ruta_descartes = ruta + ".descartado"
+        self.lote_fsync = lote_fsync
+        self.entradas = 0
+        self._sin_fsync = 0
+
+    @contextmanager
+    def _bloqueo(self):
+        fd = os.open(self.ruta + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            os.close(fd)
+
+    def anotar(self, fila):
+        """Añadir un registro al diario (duradero tras el siguiente fsync)"""
+        linea = _codificar(fila)
+        with self._bloqueo():
+            self._recuperar()
+            fd = os.open(self.ruta, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, linea)
+                self._sin_fsync += 1
+                if self._sin_fsync >= self.lote_fsync:
+                    os.fsync(fd)
+                    self._sin_fsync = 0
+            finally:
+                os.close(fd)
+        self.entradas += 1
+
+    def sincronizar(self):
+        """Forzar a disco lo escrito desde el último fsync"""
+        if not self._sin_fsync or not os.path.exists(self.ruta):
+            return
+        fd = os.open(self.ruta, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self._sin_fsync = 0
+
+    def leer_historial(self):
+        """Historial del almacenamiento y registros del diario aún no volcados.
+
+        Ambos se leen bajo el mismo bloqueo (y tras recuperar una compactación
+        interrumpida) para que ningún registro aparezca dos veces.
+        """
+        with self._bloqueo():
+            self._recuperar()
+            return self.almacenamiento.leer(), self._leer_validas()
+
+    def compactar(self):
+        """Volcar el diario al almacenamiento y vaciarlo; devuelve cuántos registros"""
+        import pandas as pd
+        from almacenamiento import COLUMNAS, FORMATO_FECHA
+
+        with self._bloqueo():
+            self._recuperar()
+            filas = self._leer_validas()
+            if not filas:
+                return 0
+
+            self._guardar_punto(self.almacenamiento.punto_restauracion())
+            df = pd.DataFrame(filas, columns=COLUMNAS)
+            df['Fecha'] = pd.to_datetime(df['Fecha'], format=FORMATO_FECHA)
+            self.almacenamiento.importar(df)
+
+            self._vaciar()
+            os.remove(self.ruta_compactando)
+        self.entradas = 0
+        return len(filas)
+
+    def _leer_validas(self):
+        if not os.path.exists(self.ruta):
+            self.entradas = 0
+            return []
+        with open(self.ruta, 'rb') as f:
+            contenido = f.read()
+
+        filas = []
+        validos = 0
+        for linea in contenido.splitlines(keepends=True):
+            fila = _decodificar(linea) if linea.endswith(b"\n") else None
+            if fila is None:
+                break
+            filas.append(fila)
+            validos += len(linea)
+
+        if validos < len(contenido):
+            # Se aparta la cola dañada para poder revisarla y se trunca
+            with open(self.ruta_descartes, 'ab') as f:
+                f.write(contenido[validos:])
+            os.truncate(self.ruta, validos)
+            print(f"⚠️ Diario {self.ruta}: descartados {len(contenido) - validos} bytes dañados "
+                  f"(guardados en {self.ruta_descartes})")
+        self.entradas = len(filas)
+        return filas
+
+    def _guardar_punto(self, punto):
+        temporal = self.ruta_compactando + ".tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({"punto": punto}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self.ruta_compactando)
+
+    def _vaciar(self):
+        fd = os.open(self.ruta, os.O_WRONLY)
+        try:
+            os.ftruncate(fd, 0)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self._sin_fsync = 0
+
+    def _recuperar(self):
+        # Una compactación interrumpida deja el punto de restauración: si el
+        # diario aún tiene registros, el volcado no llegó a confirmarse y se
+        # deshace para repetirlo entero
+        if not os.path.exists(self.ruta_compactando):
+            return
+        with open(self.ruta_compactando, encoding='utf-8') as f:
+            punto = json.load(f)["punto"]
+        if os.path.exists(self.ruta) and os.path.getsize(self.ruta):
+            self.almacenamiento.restaurar(punto)
+            print(f"♻️ Compactación interrumpida de {self.ruta}: se repetirá")
+        os.remove(self.ruta_compactando)
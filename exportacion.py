@@ -0,0 +1,418 @@
+"""Generación del informe PDF, independiente de la interfaz Qt"""
+import hashlib
+import json
+import os
+import textwrap
+import time
+from datetime import datetime
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+
+from almacenamiento import TAMANO_LOTE
+from analitica import AnaliticaSintomas, describir_resumen
+from codificacion import ESCALAS, codigos_columna
+from graficos import (COLUMNAS_GRAFICO, ESTILO_INFORME, MAX_PUNTOS_INFORME, concatenar_series,
+                      dibujar, figura_offscreen, preparar_series)
+from instrumentacion import medido, medir
+from suspensiones import SuspensionesPorLotes, describir_analisis
+
+# Tabla de registros: (columna, cabecera, ancho en caracteres, codificada).
+# Las columnas codificadas muestran la posición de la opción en su escala
+# (ver la leyenda); la de notas (ancho None) ocupa el resto de la línea.
+COLUMNAS_TABLA = [
+    ("Fecha", "Fecha", 10, False),
+    ("Congestion", "Cong", 4, False),
+    ("Picor", "Pic", 3, False),
+    ("Dolor", "Dol", 3, True),
+    ("Secrecion", "Sec", 3, True),
+    ("Respibien_Suspendido", "Resp", 4, True),
+    ("Utabon_Suspendido", "Uta", 3, True),
+    ("Dificultad_Respirar", "Dif", 3, True),
+    ("Tos", "Tos", 3, True),
+    ("Estornudos", "Est", 3, False),
+    ("Erupciones", "Eru", 3, True),
+    ("Urticaria", "Urt", 3, True),
+    ("Hinchazón", "Hin", 3, True),
+    ("Dias_PostOp", "PostOp", 6, False),
+    ("Mejoria_Respiracion", "Mej", 3, True),
+    ("Notas", "Otros medicamentos / Notas", None, False),
+]
+# Letra de ancho fijo: las columnas se alinean componiendo cada fila como
+# una sola línea de texto, sin una celda por valor
+FUENTE_TABLA = "Courier"
+TAMANO_FUENTE_TABLA = 7
+ALTO_FILA = 3.5
+
+# El gráfico se incrusta desde memoria: "png" lo rasteriza a DPI_GRAFICO;
+# "svg" lo dibuja como vectores (nítido a cualquier escala), pero fpdf2
+# interpreta cada marcador por separado y con menos de ~2000 registros (sin
+# reducir a MAX_PUNTOS_INFORME) la exportación tarda de 2 a 4 veces más
+FORMATOS_GRAFICO = ("png", "svg")
+FORMATO_GRAFICO = "png"
+DPI_GRAFICO = 150
+
+# Informes recientes que se conservan para reutilizarlos si los datos no han
+# cambiado; VERSION_INFORME se incrementa al cambiar el diseño del PDF
+MAX_INFORMES_CACHE = 10
+INDICE_CACHE = "cache_informes.json"
+VERSION_INFORME = 3
+
+
+class ExportacionCancelada(Exception):
+    """El usuario canceló la exportación antes de terminar"""
+
+
+class CacheInformes:
+    """Informes ya generados, indexados por la huella de sus datos.
+
+    El índice (huella -> archivo y último uso) se guarda en la carpeta de
+    reportes; al superar `maximo` se borran los menos usados recientemente.
+    Los PDF de la carpeta que no están en el índice no se tocan.
+    """
+
+    def __init__(self, carpeta, maximo=MAX_INFORMES_CACHE):
+        self.carpeta = carpeta
+        self.maximo = maximo
+        self.ruta_indice = os.path.join(carpeta, INDICE_CACHE)
+
+    def _leer_indice(self):
+        try:
+            with open(self.ruta_indice, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _guardar_indice(self, indice):
+        temporal = self.ruta_indice + ".tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(indice, f, indent=2)
+        os.replace(temporal, self.ruta_indice)
+
+    def buscar(self, huella):
+        """Ruta del informe generado con esa huella, o None"""
+        indice = self._leer_indice()
+        entrada = indice.get(huella)
+        if entrada is None:
+            return None
+
+        ruta = os.path.join(self.carpeta, entrada["archivo"])
+        if not os.path.exists(ruta):
+            del indice[huella]
+            self._guardar_indice(indice)
+            return None
+
+        entrada["usado"] = time.time()
+        self._guardar_indice(indice)
+        return ruta
+
+    def guardar(self, huella, ruta):
+        """Registrar un informe nuevo y descartar los que sobren"""
+        indice = self._leer_indice()
+        indice[huella] = {"archivo": os.path.basename(ruta), "usado": time.time()}
+
+        sobrantes = sorted(indice, key=lambda clave: indice[clave]["usado"])[:-self.maximo]
+        for clave in sobrantes:
+            antiguo = os.path.join(self.carpeta, indice.pop(clave)["archivo"])
+            if os.path.exists(antiguo):
+                os.remove(antiguo)
+        self._guardar_indice(indice)
+
+
+def huella_informe(almacenamiento, resumen, desde, hasta, formato_grafico, dpi):
+    """Resumen SHA-256 de todo lo que determina el contenido del informe:
+    el historial (su archivo y el resumen del rango) y las opciones del gráfico.
+
+    El historial se identifica por la firma del archivo (tamaño y fecha de
+    modificación, ver Almacenamiento*.firma) en lugar de volver a leer los
+    registros del rango: cualquier escritura la cambia.
+    """
+    huella = hashlib.sha256()
+    datos = [VERSION_INFORME, formato_grafico, dpi, MAX_PUNTOS_INFORME, str(desde), str(hasta),
+             os.path.abspath(almacenamiento.ruta), almacenamiento.firma(), resumen]
+    huella.update(json.dumps(datos, default=str).encode())
+    return huella.hexdigest()
+
+
+def _sin_aviso(porcentaje, mensaje):
+    pass
+
+
+def _nunca_cancelado():
+    return False
+
+
+@medido("pdf.informe")
+def exportar_informe(almacenamiento, carpeta, desde=None, hasta=None, series=None,
+                     progreso=None, cancelado=None, tamano_lote=TAMANO_LOTE,
+                     formato_grafico=FORMATO_GRAFICO, dpi=DPI_GRAFICO, cache=True):
+    """Generar el PDF con los registros del rango y los 4 gráficos.
+
+    Los registros se leen del almacenamiento por lotes de `tamano_lote` y se
+    escriben en el PDF a medida que llegan, así que nunca se tiene el
+    historial completo en memoria; con `desde`/`hasta` solo se leen los
+    registros de ese periodo. Puede ejecutarse fuera del hilo de la
+    interfaz: usa una figura Agg propia en lugar de pyplot. Si se pasan
+    `series` ya preparadas (las del gráfico en pantalla) no se vuelven a
+    calcular. El gráfico se incrusta sin pasar por disco, como PNG a `dpi`
+    puntos por pulgada o como vectores (`formato_grafico="svg"`).
+    `progreso(porcentaje, mensaje)` recibe el avance y `cancelado()` se
+    consulta periódicamente; si devuelve True se lanza ExportacionCancelada
+    y no se escribe ningún archivo.
+    Si ya se generó un informe con los mismos datos y opciones (y `cache` es
+    True) se devuelve ese mismo archivo sin volver a generarlo.
+    Devuelve la ruta del PDF.
+    """
+    if formato_grafico not in FORMATOS_GRAFICO:
+        raise ValueError(f"Formato de gráfico no soportado: {formato_grafico}")
+    progreso = progreso or _sin_aviso
+    cancelado = cancelado or _nunca_cancelado
+
+    resumen = almacenamiento.resumen(desde, hasta)
+    if not resumen["registros"]:
+        raise ValueError("No hay registros en el periodo seleccionado.")
+
+    if not os.path.exists(carpeta):
+        os.makedirs(carpeta)
+
+    if cache:
+        cache_informes = CacheInformes(carpeta)
+        huella = huella_informe(almacenamiento, resumen, desde, hasta, formato_grafico, dpi)
+        ruta_previa = cache_informes.buscar(huella)
+        if ruta_previa is not None:
+            progreso(100, "Sin cambios desde el último informe: se reutiliza")
+            return ruta_previa
+
+    fecha_actual = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if cache:
+        # Con la huella en el nombre, dos informes distintos generados en el
+        # mismo segundo no pueden pisarse en la caché
+        fecha_actual += f"_{huella[:8]}"
+    pdf_path = os.path.join(carpeta, f"historial_sintomas_{fecha_actual}.pdf")
+
+    progreso(0, "Componiendo el PDF...")
+    pdf = _crear_pdf(resumen)
+    diseno = _DisenoTabla(pdf)
+    _escribir_cabecera_tabla(pdf, diseno)
+
+    # Las series del gráfico se van acumulando lote a lote (solo fechas y
+    # valores numéricos) si no vienen ya preparadas
+    partes = [] if series is None else None
+    # Las estadísticas móviles también se acumulan lote a lote
+    analitica = AnaliticaSintomas()
+    # Y la fecha de cada suspensión, para el análisis junto con sus medias diarias
+    suspensiones = SuspensionesPorLotes()
+    total = resumen["registros"]
+    escritos = 0
+    for lote in almacenamiento.leer_lotes(desde, hasta, tamano_lote):
+        if cancelado():
+            raise ExportacionCancelada()
+        _escribir_registros(pdf, diseno, lote, escritos, total, progreso, cancelado)
+        escritos += len(lote)
+        analitica.agregar_lote(lote)
+        suspensiones.agregar_lote(lote)
+        if partes is not None:
+            partes.append(preparar_series(lote))
+        progreso(int(80 * escritos / total), f"Registro {escritos} de {total}...")
+
+    _escribir_tendencias(pdf, analitica.resumen(resumen["ultima_fecha"]))
+    _escribir_suspensiones(pdf, suspensiones.analizar(analitica.medias_diarias()))
+
+    progreso(80, "Generando gráficos...")
+    if partes is not None:
+        series = concatenar_series(partes)
+    imagen = _grafico_en_memoria(series, formato_grafico, dpi)
+
+    if cancelado():
+        raise ExportacionCancelada()
+    _insertar_grafico(pdf, imagen)
+
+    progreso(95, "Guardando el PDF...")
+    with medir("pdf.guardar"):
+        pdf.output(pdf_path)
+    if cache:
+        cache_informes.guardar(huella, pdf_path)
+    progreso(100, "Exportación completada")
+    return pdf_path
+
+
+def exportar_grafico(almacenamiento, ruta, desde=None, hasta=None, dpi=DPI_GRAFICO,
+                     tamano_lote=TAMANO_LOTE):
+    """Guardar solo la figura con los 4 gráficos (PNG, o SVG si la ruta
+    termina en .svg) leyendo los registros del rango por lotes"""
+    formato = "svg" if ruta.lower().endswith(".svg") else "png"
+    series = concatenar_series(
+        preparar_series(lote)
+        for lote in almacenamiento.leer_lotes(desde, hasta, tamano_lote, columnas=COLUMNAS_GRAFICO)
+    )
+    if not len(series):
+        raise ValueError("No hay registros en el periodo seleccionado.")
+    with open(ruta, 'wb') as f:
+        f.write(_grafico_en_memoria(series, formato, dpi).getbuffer())
+    return ruta
+
+
+def _grafico_en_memoria(series, formato, dpi):
+    fig = figura_offscreen((16, 12))
+    # En papel se conservan los puntos reales más representativos (LTTB)
+    dibujar(fig, series.reducir(MAX_PUNTOS_INFORME, modo="lttb"), ESTILO_INFORME)
+    imagen = BytesIO()
+    # Sin bloque <metadata>: fpdf no lo interpreta y no aporta nada al informe
+    metadatos = {"Creator": None, "Date": None, "Format": None, "Type": None} if formato == "svg" else None
+    with medir(f"pdf.guardar_{formato}"):
+        fig.savefig(imagen, format=formato, dpi=dpi, bbox_inches='tight', facecolor='white', edgecolor='none',
+                    metadata=metadatos)
+    imagen.seek(0)
+    return imagen
+
+
+def _crear_pdf(resumen):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Helvetica", size=16)
+    pdf.cell(200, 10, text="Mis alergias y Yo", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+    pdf.set_font("Helvetica", size=12)
+    pdf.cell(200, 8, text="Seguimiento de Recuperación Post-Operatoria", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+    pdf.cell(200, 6, text="Alergia Medicamentosa - Descongestivos Nasales", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+    pdf.ln(10)
+
+    # Resumen
+    pdf.set_font("Helvetica", size=10)
+    pdf.cell(200, 6, text=f"Reporte generado: {datetime.now().strftime('%d-%m-%Y %H:%M')}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.cell(200, 6, text=f"Periodo: {resumen['primera_fecha'].strftime('%d-%m-%Y')} a {resumen['ultima_fecha'].strftime('%d-%m-%Y')}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.cell(200, 6, text=f"Total de registros: {resumen['registros']}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    # Estadísticas resumidas (sin media si la columna está vacía en todo el periodo)
+    pdf.cell(200, 6, text=f"Congestión promedio: {_media(resumen['congestion_media'])} | Picor promedio: {_media(resumen['picor_media'])}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    pdf.ln(5)
+    _escribir_leyenda(pdf)
+    return pdf
+
+
+def _media(valor):
+    return "sin datos" if valor is None or pd.isna(valor) else f"{valor:.1f}"
+
+
+def _escribir_leyenda(pdf):
+    """Explicar los códigos de la tabla (posición de cada opción en su escala)"""
+    partes = ["Cong/Pic: escala 0-10", "Est: número de estornudos", "PostOp: días desde la operación"]
+    for columna, cabecera, _, codificada in COLUMNAS_TABLA:
+        if codificada:
+            opciones = ", ".join(f"{codigo} {opcion}" for codigo, opcion in enumerate(ESCALAS[columna]))
+            partes.append(f"{cabecera} ({columna.replace('_', ' ')}): {opciones}")
+    pdf.set_font("Helvetica", size=7)
+    pdf.multi_cell(0, 3.5, "Leyenda - " + " | ".join(partes))
+    pdf.ln(3)
+
+
+class _DisenoTabla:
+    """Anchos de la tabla, calculados una sola vez por informe"""
+
+    def __init__(self, pdf):
+        pdf.set_font(FUENTE_TABLA, size=TAMANO_FUENTE_TABLA)
+        caracteres = int((pdf.w - pdf.l_margin - pdf.r_margin - 2 * pdf.c_margin) / pdf.get_string_width("0"))
+        self.sangria = sum(ancho + 1 for _, _, ancho, _ in COLUMNAS_TABLA[:-1])
+        self.ancho_notas = caracteres - self.sangria
+        self.cabecera = " ".join(
+            cabecera.center(ancho) if ancho else cabecera for _, cabecera, ancho, _ in COLUMNAS_TABLA
+        )
+
+    def lineas(self, lote):
+        """Líneas de texto de cada registro del lote (más de una si las notas no caben)"""
+        vacia = pd.Series('', index=lote.index)
+        fila = vacia
+        for columna, _, ancho, codificada in COLUMNAS_TABLA[:-1]:
+            if columna == 'Fecha':
+                textos = lote['Fecha'].dt.strftime('%d-%m-%Y')
+            elif codificada:
+                codigos = codigos_columna(lote, columna)
+                textos = pd.Series(np.where(codigos >= 0, codigos.astype(str), ''), index=lote.index)
+            elif columna in lote.columns:
+                textos = _numeros(lote[columna])
+            else:
+                textos = vacia
+            fila = fila + textos.str.center(ancho) + ' '
+
+        # Los saltos de línea del formulario (y los espacios repetidos) se
+        # dejan en un solo espacio: cell() no los interpreta
+        otros = _una_linea(lote.get('Otros_Medicamentos', vacia))
+        notas = _una_linea(lote.get('Notas', vacia))
+        separador = vacia.where((otros == '') | (notas == ''), '. ')
+        notas = ('Otros: ' + otros).where(otros != '', '') + separador + notas
+
+        sangria = ' ' * self.sangria
+        for inicio, nota in zip(fila.tolist(), notas.tolist()):
+            if len(nota) <= self.ancho_notas:
+                yield [inicio + nota]
+            else:
+                trozos = textwrap.wrap(nota, self.ancho_notas)
+                yield [inicio + trozos[0]] + [sangria + trozo for trozo in trozos[1:]]
+
+
+def _una_linea(serie):
+    return serie.fillna('').astype(str).str.split().str.join(' ')
+
+
+def _numeros(serie):
+    valores = pd.to_numeric(serie, errors='coerce').round().astype('Int64')
+    return valores.astype(str).where(valores.notna(), '')
+
+
+@medido("pdf.tabla")
+def _escribir_registros(pdf, diseno, lote, escritos, total, progreso, cancelado):
+    """Añadir al PDF las filas de la tabla de un lote, página a página"""
+    for numero, lineas in enumerate(diseno.lineas(lote), start=escritos + 1):
+        if pdf.get_y() + ALTO_FILA * len(lineas) > pdf.page_break_trigger:
+            # Cambio de página: punto de control y cabecera repetida
+            if cancelado():
+                raise ExportacionCancelada()
+            progreso(int(80 * numero / total), f"Registro {numero} de {total}...")
+            pdf.add_page()
+            _escribir_cabecera_tabla(pdf, diseno)
+        for linea in lineas:
+            pdf.cell(0, ALTO_FILA, linea, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+
+def _escribir_cabecera_tabla(pdf, diseno):
+    pdf.set_font(FUENTE_TABLA, 'B', TAMANO_FUENTE_TABLA)
+    pdf.cell(0, ALTO_FILA + 0.5, diseno.cabecera, border='B', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.set_font(FUENTE_TABLA, size=TAMANO_FUENTE_TABLA)
+
+
+def _escribir_tendencias(pdf, tendencias):
+    pdf.ln(5)
+    pdf.set_font("Helvetica", size=12)
+    pdf.cell(0, 8, text="Tendencias de los últimos días (hasta el último registro)", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.set_font("Helvetica", size=8)
+    for linea in describir_resumen(tendencias):
+        pdf.multi_cell(0, 4, linea, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+
+def _escribir_suspensiones(pdf, analisis):
+    pdf.ln(5)
+    pdf.set_font("Helvetica", size=12)
+    pdf.cell(0, 8, text="Efecto de suspender los medicamentos", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.set_font("Helvetica", size=8)
+    for linea in describir_analisis(analisis):
+        pdf.multi_cell(0, 4, linea, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+
+@medido("pdf.grafico")
+def _insertar_grafico(pdf, imagen):
+    # Añadir página nueva para el gráfico si es necesario
+    if pdf.get_y() > 200:
+        pdf.add_page()
+
+    # Añadir gráfico completo con los 4 subgráficos
+    try:
+        pdf.ln(5)
+        pdf.set_font("Helvetica", size=12)
+        pdf.cell(200, 8, text="Gráficos de Evolución", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+        pdf.ln(5)
+        pdf.image(imagen, x=10, w=190)
+    except Exception as img_error:
+        pdf.cell(200, 10, text=f"Error al insertar gráfico: {str(img_error)}", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
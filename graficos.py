@@ -0,0 +1,430 @@
+"""Motor único de gráficos para el lienzo Qt y el informe PDF"""
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from codificacion import codificar_columna
+from instrumentacion import contar, medido, medir
+
+# Cada panel: título, etiqueta del eje Y, series (clave, etiqueta, marcador,
+# color, ajustes extra del informe) y texto a mostrar si no hay ninguna serie
+PANELES = [
+    {
+        "titulo": "Síntomas Nasales",
+        "eje_y": "Intensidad (0-10)",
+        "series": [
+            ("Congestion", "Congestión", "o", "red", {}),
+            ("Picor", "Picor", "s", "orange", {}),
+            ("Estornudos", "Estornudos", "^", "blue", {}),
+        ],
+        "sin_datos": "No hay datos\nnasales",
+    },
+    {
+        "titulo": "Días desde suspensión",
+        "eje_y": "Días",
+        "series": [
+            ("Respibien", "Respibien", "o", "green", {}),
+            ("Utabon", "Utabon", "s", "purple", {}),
+        ],
+        "sin_datos": "No hay datos\nde medicamentos",
+    },
+    {
+        "titulo": "Recuperación Post-operatoria",
+        "eje_y": "Días desde operación",
+        "series": [
+            ("Dias_PostOp", "Días post-op", "d", "brown", {"linewidth": 2}),
+        ],
+        "sin_datos": "No hay datos\npost-operatorios",
+    },
+    {
+        "titulo": "Evolución del Dolor",
+        "eje_y": "Intensidad",
+        "series": [
+            ("Dolor", "Dolor", "x", "red", {"linewidth": 2, "markersize": 8}),
+        ],
+        "sin_datos": "No hay datos\nde dolor",
+    },
+]
+
+# Columnas del historial que necesita preparar_series (para leer solo esas)
+COLUMNAS_GRAFICO = ["Fecha", "Congestion", "Picor", "Estornudos", "Dias_PostOp",
+                    "Respibien_Suspendido", "Utabon_Suspendido", "Dolor"]
+
+# Marcador de cada serie, para restaurarlo al volver a resolución completa
+_MARCADORES = {
+    clave: marcador
+    for panel in PANELES
+    for clave, _, marcador, _, _ in panel["series"]
+}
+
+# Por encima de estos puntos visibles se activa el nivel de detalle reducido
+MAX_PUNTOS_PANTALLA = 400
+MAX_PUNTOS_INFORME = 1500
+
+# Periodos de agregación, del más fino al más grueso: (días, regla, nombre)
+PERIODOS_AGREGACION = [
+    (1, "D", "día"),
+    (7, "W", "semana"),
+    (30.4, "MS", "mes"),
+]
+
+ESTILO_PANTALLA = {
+    "titulo": {},
+    "leyenda": 8,
+    "etiquetas_x": 8,
+    "rejilla": False,
+    "extras_informe": False,
+    "margen": None,
+}
+
+ESTILO_INFORME = {
+    "titulo": {"fontsize": 14, "fontweight": "bold"},
+    "leyenda": 10,
+    "etiquetas_x": 10,
+    "rejilla": True,
+    "extras_informe": True,
+    "margen": 3.0,
+}
+
+
+class SeriesGrafico:
+    """Datos ya preparados para dibujar: fechas y una serie numérica por clave.
+
+    Tras reducir() pueden llevar además bandas (mínimo, máximo) por clave y el
+    nombre del periodo de agregación usado.
+    """
+
+    def __init__(self, fechas, valores, bandas=None, periodo=None):
+        self.fechas = fechas
+        self.valores = valores
+        self.bandas = bandas
+        self.periodo = periodo
+
+    def __len__(self):
+        return len(self.fechas)
+
+    def extender(self, nuevas):
+        """Devolver las series con los registros de `nuevas` añadidos al final.
+
+        Devuelve None si las nuevas filas cambian qué series existen (por
+        ejemplo, el primer registro con días post-operatorios).
+        """
+        if set(nuevas.valores) != set(self.valores):
+            return None
+        return SeriesGrafico(
+            np.concatenate([self.fechas, nuevas.fechas]),
+            {clave: np.concatenate([valores, nuevas.valores[clave]])
+             for clave, valores in self.valores.items()}
+        )
+
+    def recortar(self, desde, hasta):
+        """Registros entre dos fechas, más un punto a cada lado para que las
+        líneas lleguen hasta los bordes del área visible"""
+        inicio = max(np.searchsorted(self.fechas, desde, side='left') - 1, 0)
+        fin = min(np.searchsorted(self.fechas, hasta, side='right') + 1, len(self.fechas))
+        return SeriesGrafico(
+            self.fechas[inicio:fin],
+            {clave: valores[inicio:fin] for clave, valores in self.valores.items()}
+        )
+
+    @medido("grafico.reducir")
+    def reducir(self, max_puntos, modo="bandas"):
+        """Nivel de detalle: devolver como mucho unos max_puntos por serie.
+
+        En modo "bandas" se agrega por día, semana o mes (según el rango
+        cubierto) dibujando la media con una banda mínimo-máximo; en modo
+        "lttb" se conservan los puntos más representativos de la forma.
+        """
+        if len(self) <= max_puntos:
+            return self
+        if modo == "lttb":
+            return self._reducir_lttb(max_puntos)
+        return self._agregar(max_puntos)
+
+    def _agregar(self, max_puntos):
+        # El periodo más fino que deja el rango cubierto en max_puntos o menos
+        dias = (self.fechas[-1] - self.fechas[0]) / np.timedelta64(1, 'D')
+        for dias_periodo, regla, periodo in PERIODOS_AGREGACION:
+            if dias / dias_periodo <= max_puntos:
+                break
+
+        grupos = pd.DataFrame(self.valores, index=pd.DatetimeIndex(self.fechas)).resample(regla)
+        media = grupos.mean().dropna(how='all')
+        minimo = grupos.min().loc[media.index]
+        maximo = grupos.max().loc[media.index]
+
+        agregadas = SeriesGrafico(
+            media.index.to_numpy(),
+            {clave: media[clave].to_numpy() for clave in self.valores},
+            {clave: (minimo[clave].to_numpy(), maximo[clave].to_numpy()) for clave in self.valores},
+            periodo
+        )
+        # Muchos registros en muy poco tiempo: la agregación no basta
+        if len(agregadas) > max_puntos:
+            return self._reducir_lttb(max_puntos)
+        return agregadas
+
+    def _reducir_lttb(self, max_puntos):
+        # Se une la selección de cada serie para que todas compartan fechas
+        umbral = max(3, max_puntos // len(self.valores))
+        x = self.fechas.astype('datetime64[us]').astype('int64').astype(float)
+        indices = np.unique(np.concatenate([
+            _indices_lttb(x, np.nan_to_num(valores), umbral)
+            for valores in self.valores.values()
+        ]))
+        return SeriesGrafico(
+            self.fechas[indices],
+            {clave: valores[indices] for clave, valores in self.valores.items()},
+            periodo="lttb"
+        )
+
+
+def _indices_lttb(x, y, umbral):
+    """Largest-Triangle-Three-Buckets: índices de los umbral puntos que mejor
+    conservan la forma visual de la serie"""
+    n = len(x)
+    if umbral >= n or umbral < 3:
+        return np.arange(n)
+
+    # Primer y último punto fijos; el resto se reparte en umbral-2 cubos
+    bordes = np.linspace(1, n - 1, umbral - 1).astype(int)
+    indices = np.empty(umbral, dtype=int)
+    indices[0] = 0
+    anterior = 0
+    for i in range(umbral - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        siguiente_fin = bordes[i + 2] if i + 2 < len(bordes) else n
+        media_x = x[fin:siguiente_fin].mean()
+        media_y = y[fin:siguiente_fin].mean()
+
+        areas = np.abs(
+            (x[anterior] - media_x) * (y[inicio:fin] - y[anterior])
+            - (x[anterior] - x[inicio:fin]) * (media_y - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        indices[i + 1] = anterior
+
+    indices[-1] = n - 1
+    return indices
+
+
+@medido("grafico.series")
+def preparar_series(df):
+    """Extraer y codificar del historial todas las series de los 4 paneles"""
+    valores = {
+        "Congestion": df["Congestion"].to_numpy(dtype=float),
+        "Picor": df["Picor"].to_numpy(dtype=float),
+        "Respibien": codificar_columna(df, "Respibien_Suspendido").to_numpy(),
+        "Utabon": codificar_columna(df, "Utabon_Suspendido").to_numpy(),
+        "Dolor": codificar_columna(df, "Dolor").to_numpy(),
+    }
+    if "Estornudos" in df.columns:
+        valores["Estornudos"] = df["Estornudos"].to_numpy(dtype=float)
+    if "Dias_PostOp" in df.columns and not df["Dias_PostOp"].isna().all():
+        valores["Dias_PostOp"] = df["Dias_PostOp"].to_numpy(dtype=float)
+    return SeriesGrafico(df["Fecha"].to_numpy(), valores)
+
+
+def concatenar_series(partes):
+    """Unir series preparadas por lotes consecutivos (p. ej. al recorrer el
+    historial por partes); las claves que falten en un lote quedan a NaN"""
+    partes = [parte for parte in partes if len(parte)]
+    if not partes:
+        return preparar_series(pd.DataFrame(columns=["Fecha", "Congestion", "Picor"]))
+
+    claves = set().union(*(parte.valores for parte in partes))
+    return SeriesGrafico(
+        np.concatenate([parte.fechas for parte in partes]),
+        {clave: np.concatenate([parte.valores.get(clave, np.full(len(parte), np.nan))
+                                for parte in partes])
+         for clave in claves}
+    )
+
+
+def figura_offscreen(tamano=(16, 12), dpi=100):
+    """Crear una figura Agg independiente de pyplot (segura fuera del hilo Qt)"""
+    figura = Figure(figsize=tamano, dpi=dpi)
+    FigureCanvasAgg(figura)
+    return figura
+
+
+class DibujoPaneles:
+    """Artistas de los 4 paneles ya dibujados, para actualizarlos sin rehacerlos"""
+
+    def __init__(self, figura):
+        self.figura = figura
+        self.ejes = []
+        self.lineas = {}
+        self.bandas = {}
+
+
+def dibujar(figura, series, estilo=ESTILO_PANTALLA, ajustar=True):
+    """Dibujar los 4 paneles sobre la figura indicada (lienzo Qt u offscreen).
+
+    Con ajustar=False no se llama a tight_layout(): queda para quien pinta
+    el lienzo, que puede aplazarlo. Devuelve un DibujoPaneles para poder actualizar después las líneas con
+    actualizar_dibujo() sin redibujar la figura desde cero.
+    """
+    figura.clear()
+    dibujo = DibujoPaneles(figura)
+
+    contar("grafico.dibujos_completos")
+    for posicion, panel in enumerate(PANELES, start=1):
+        with medir(f"grafico.panel.{panel['titulo']}"):
+            _dibujar_panel(dibujo, figura, posicion, panel, series, estilo)
+
+    _dibujar_bandas(dibujo, series)
+
+    if ajustar:
+        with medir("grafico.tight_layout"):
+            if estilo["margen"] is None:
+                figura.tight_layout()
+            else:
+                figura.tight_layout(pad=estilo["margen"])
+    return dibujo
+
+
+def _dibujar_panel(dibujo, figura, posicion, panel, series, estilo):
+    # Eje X compartido: al hacer zoom en un panel se mueven todos
+    compartido = dibujo.ejes[0] if dibujo.ejes else None
+    ax = figura.add_subplot(2, 2, posicion, sharex=compartido)
+    ax.set_title(panel["titulo"], **estilo["titulo"])
+    dibujo.ejes.append(ax)
+
+    dibujadas = 0
+    for clave, etiqueta, marcador, color, extras in panel["series"]:
+        if clave not in series.valores:
+            continue
+        ajustes = extras if estilo["extras_informe"] else {}
+        if series.periodo is not None:
+            marcador = None
+        dibujo.lineas[clave], = ax.plot(series.fechas, series.valores[clave], marker=marcador,
+                                        label=etiqueta, color=color, **ajustes)
+        dibujadas += 1
+
+    if not dibujadas:
+        ax.text(0.5, 0.5, panel["sin_datos"], ha='center', va='center',
+                fontsize=12, transform=ax.transAxes)
+        return
+
+    ax.set_ylabel(panel["eje_y"])
+    ax.legend(fontsize=estilo["leyenda"])
+    ax.tick_params(axis='x', rotation=45, labelsize=estilo["etiquetas_x"])
+    if estilo["rejilla"]:
+        ax.grid(True, alpha=0.3)
+
+
+def _dibujar_bandas(dibujo, series):
+    for banda in dibujo.bandas.values():
+        banda.remove()
+    dibujo.bandas = {}
+    if not series.bandas:
+        return
+
+    for clave, linea in dibujo.lineas.items():
+        minimo, maximo = series.bandas[clave]
+        dibujo.bandas[clave] = linea.axes.fill_between(
+            series.fechas, minimo, maximo, color=linea.get_color(), alpha=0.15, linewidth=0
+        )
+
+
+@medido("grafico.actualizar")
+def actualizar_dibujo(dibujo, series, escalar_x=True):
+    """Sustituir los datos de las líneas ya dibujadas y reajustar los ejes.
+
+    Con escalar_x=False se respeta el rango horizontal actual (zoom del
+    usuario) y solo se reajusta el eje Y. Devuelve False si las series ya no
+    encajan con los paneles dibujados y hace falta llamar a dibujar().
+    """
+    if set(dibujo.lineas) != set(series.valores):
+        return False
+
+    for clave, linea in dibujo.lineas.items():
+        linea.set_data(series.fechas, series.valores[clave])
+        linea.set_marker(_MARCADORES[clave] if series.periodo is None else 'None')
+
+    _dibujar_bandas(dibujo, series)
+
+    for ax in dibujo.ejes:
+        ax.relim()
+        # relim() no tiene en cuenta las bandas: se añaden a mano
+        for banda in dibujo.bandas.values():
+            if banda.axes is ax:
+                for trazo in banda.get_paths():
+                    ax.dataLim.update_from_data_xy(trazo.vertices, ignore=False)
+        if escalar_x:
+            # Un set_xlim() previo (zoom o rango fijo) desactiva el autoescalado
+            ax.set_autoscalex_on(True)
+        ax.autoscale_view(scalex=escalar_x)
+    return True
+
+
+def rango_dias(desde, hasta):
+    """Rango datetime64 desde el inicio de `desde` hasta el final de `hasta` (fechas)"""
+    return (
+        np.datetime64(desde, 'us'),
+        np.datetime64(hasta, 'D') + np.timedelta64(1, 'D') - np.timedelta64(1, 'us')
+    )
+
+
+def rango_visible(ax):
+    """Fechas (datetime64) de los extremos del eje X actual"""
+    izquierda, derecha = ax.get_xlim()
+    return tuple(
+        np.datetime64(mdates.num2date(valor).replace(tzinfo=None), 'us')
+        for valor in (izquierda, derecha)
+    )
+
+
+class MotorGraficos:
+    """Prepara las series una vez por versión del historial y las reutiliza.
+
+    La interfaz y la exportación comparten la misma instancia, de modo que el
+    informe aprovecha el trabajo ya hecho para el gráfico en pantalla.
+    """
+
+    def __init__(self):
+        self._version = None
+        self._version_orden = None
+        self._series = None
+        self._clave_rango = None
+        self._series_rango = None
+
+    def series(self, almacen, desde=None, hasta=None):
+        """Series del historial actual, recalculadas solo si cambió la versión.
+
+        Con `desde`/`hasta` se devuelve solo ese tramo: si el historial completo
+        no está preparado, se codifican únicamente los registros del rango.
+        """
+        if desde is None and hasta is None:
+            return self._series_completas(almacen)
+
+        if self._series is not None and self._version == almacen.version:
+            return self._series.recortar(desde, hasta)
+
+        clave = (almacen.version, desde, hasta)
+        if self._clave_rango != clave:
+            self._series_rango = preparar_series(almacen.rango(desde, hasta, margen=1))
+            self._clave_rango = clave
+        return self._series_rango
+
+    def _series_completas(self, almacen):
+        # Si desde la última vez solo se han añadido registros al final, se
+        # codifican únicamente las filas nuevas
+        if self._series is not None and self._version == almacen.version:
+            return self._series
+
+        df = almacen.df
+        series = None
+        if (self._series is not None and self._version_orden == almacen.version_orden
+                and len(df) > len(self._series)):
+            series = self._series.extender(preparar_series(df.iloc[len(self._series):]))
+        if series is None:
+            series = preparar_series(df)
+
+        self._series = series
+        self._version = almacen.version
+        self._version_orden = almacen.version_orden
+        return self._series
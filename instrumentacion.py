@@ -0,0 +1,180 @@
+"""Medición opcional de tiempos, contadores y perfilado de las partes lentas
+
+Desactivada no cuesta casi nada: medir() devuelve siempre el mismo contexto
+vacío. Se activa con MIS_ALERGIAS_INSTRUMENTACION=1 (y el perfilado con
+cProfile con MIS_ALERGIAS_PERFILADO=1) o desde Ver > Rendimiento...
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from functools import wraps
+
+# Intervalos individuales que se conservan (los agregados no tienen límite)
+MAX_INTERVALOS = 1000
+# Funciones que se muestran del perfil de cProfile
+MAX_FUNCIONES_PERFIL = 30
+
+_activa = os.environ.get("MIS_ALERGIAS_INSTRUMENTACION") == "1"
+_bloqueo = threading.Lock()
+_local = threading.local()
+_inicio = time.perf_counter()
+_NADA = nullcontext()
+
+# nombre -> [veces, total, mínimo, máximo]
+_tiempos = {}
+_contadores = {}
+_intervalos = deque(maxlen=MAX_INTERVALOS)
+_perfil = None
+
+
+def activa():
+    return _activa
+
+
+def activar(valor=True):
+    global _activa
+    _activa = bool(valor)
+
+
+def medir(nombre):
+    """Contexto que mide cuánto tarda el bloque (si la instrumentación está activa)"""
+    return _medir(nombre) if _activa else _NADA
+
+
+@contextmanager
+def _medir(nombre):
+    profundidad = getattr(_local, "profundidad", 0)
+    _local.profundidad = profundidad + 1
+    comienzo = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter() - comienzo
+        _local.profundidad = profundidad
+        registrar(nombre, duracion, comienzo, profundidad)
+
+
+def registrar(nombre, duracion, comienzo=None, profundidad=0):
+    """Anotar un intervalo ya medido (p. ej. las fases del arranque)"""
+    if comienzo is None:
+        comienzo = time.perf_counter() - duracion
+    with _bloqueo:
+        agregado = _tiempos.get(nombre)
+        if agregado is None:
+            _tiempos[nombre] = [1, duracion, duracion, duracion]
+        else:
+            agregado[0] += 1
+            agregado[1] += duracion
+            agregado[2] = min(agregado[2], duracion)
+            agregado[3] = max(agregado[3], duracion)
+        _intervalos.append((nombre, comienzo - _inicio, duracion,
+                            threading.current_thread().name, profundidad))
+
+
+def medido(nombre):
+    """Decorador equivalente a envolver la función en medir(nombre)"""
+    def decorador(funcion):
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _activa:
+                return funcion(*args, **kwargs)
+            with _medir(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def contar(nombre, cantidad=1):
+    if not _activa:
+        return
+    with _bloqueo:
+        _contadores[nombre] = _contadores.get(nombre, 0) + cantidad
+
+
+def reiniciar():
+    global _inicio
+    with _bloqueo:
+        _tiempos.clear()
+        _contadores.clear()
+        _intervalos.clear()
+        _inicio = time.perf_counter()
+
+
+def perfilando():
+    return _perfil is not None
+
+
+def iniciar_perfilado():
+    """Perfilar con cProfile el hilo que llama (el de la interfaz)"""
+    global _perfil
+    if _perfil is None:
+        _perfil = cProfile.Profile()
+        _perfil.enable()
+
+
+def detener_perfilado():
+    """Parar el perfilado; devuelve el texto con las funciones más costosas"""
+    global _perfil
+    if _perfil is None:
+        return ""
+    _perfil.disable()
+    texto = io.StringIO()
+    pstats.Stats(_perfil, stream=texto).sort_stats("cumulative").print_stats(MAX_FUNCIONES_PERFIL)
+    _perfil = None
+    return texto.getvalue()
+
+
+def resumen():
+    """Agregados por nombre (de mayor a menor tiempo total), contadores e intervalos"""
+    with _bloqueo:
+        tiempos = {
+            nombre: {"veces": veces, "total_ms": total * 1000, "media_ms": total / veces * 1000,
+                     "min_ms": minimo * 1000, "max_ms": maximo * 1000}
+            for nombre, (veces, total, minimo, maximo)
+            in sorted(_tiempos.items(), key=lambda par: -par[1][1])
+        }
+        intervalos = [
+            {"nombre": nombre, "inicio_ms": inicio * 1000, "duracion_ms": duracion * 1000,
+             "hilo": hilo, "profundidad": profundidad}
+            for nombre, inicio, duracion, hilo, profundidad in _intervalos
+        ]
+        return {"tiempos": tiempos, "contadores": dict(sorted(_contadores.items())),
+                "intervalos": intervalos}
+
+
+def describir():
+    """Tabla de texto con los agregados y los contadores, para el diálogo"""
+    datos = resumen()
+    if not datos["tiempos"] and not datos["contadores"]:
+        return "Todavía no hay medidas."
+    ancho = max(map(len, [*datos["tiempos"], *datos["contadores"], "Operación"])) + 2
+    lineas = [f"{'Operación':<{ancho}}{'Veces':>7}{'Total ms':>11}{'Media ms':>10}{'Máx ms':>10}"]
+    for nombre, medida in datos["tiempos"].items():
+        lineas.append(f"{nombre:<{ancho}}{medida['veces']:>7}{medida['total_ms']:>11.1f}"
+                      f"{medida['media_ms']:>10.2f}{medida['max_ms']:>10.1f}")
+    if datos["contadores"]:
+        lineas += ["", f"{'Contador':<{ancho}}{'Valor':>7}"]
+        lineas += [f"{nombre:<{ancho}}{valor:>7}" for nombre, valor in datos["contadores"].items()]
+    return "\n".join(lineas)
+
+
+def exportar_json(ruta, perfil=""):
+    """Guardar las medidas (y el texto del perfil, si lo hay) para analizarlas aparte"""
+    datos = {"fecha": datetime.now().strftime('%d-%m-%Y %H:%M:%S'), **resumen()}
+    if perfil:
+        datos["perfil"] = perfil
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+    return ruta
+
+
+if os.environ.get("MIS_ALERGIAS_PERFILADO") == "1":
+    activar()
+    iniciar_perfilado()
@@ -1,22 +1,81 @@
 import sys
-import csv
 import os
-from datetime import datetime
+import time
+import threading
+from datetime import datetime, timedelta
+
+import instrumentacion
+from instrumentacion import medido, medir
+
+# Medición del arranque por fases: python3 main.py --medir-arranque
+MEDIR_ARRANQUE = "--medir-arranque" in sys.argv or os.environ.get("MIS_ALERGIAS_MEDIR_ARRANQUE") == "1"
+_INICIO_ARRANQUE = time.perf_counter()
+_ultima_marca = _INICIO_ARRANQUE
+_arranque_terminado = False
+
+def marcar_fase(nombre, ultima=False):
+    """Imprimir cuánto ha durado una fase del arranque (solo si se está midiendo)
+    y anotarla en la instrumentación si está activa"""
+    global _ultima_marca, _arranque_terminado
+    if _arranque_terminado or (not MEDIR_ARRANQUE and not instrumentacion.activa()):
+        return
+    ahora = time.perf_counter()
+    instrumentacion.registrar(f"arranque.{nombre}", ahora - _ultima_marca)
+    if MEDIR_ARRANQUE:
+        print(f"⏱️ {nombre}: {(ahora - _ultima_marca) * 1000:.0f} ms "
+              f"(total {(ahora - _INICIO_ARRANQUE) * 1000:.0f} ms)")
+    _ultima_marca = ahora
+    # Al salir del reposo se repiten las fases, pero ya no son del arranque
+    _arranque_terminado = ultima
+
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLabel, QPushButton, QLineEdit,
     QTextEdit, QHBoxLayout, QComboBox, QMessageBox, QMenuBar, QAction,
-    QDialog, QScrollArea, QSystemTrayIcon, QMenu
+    QDialog, QScrollArea, QSystemTrayIcon, QMenu, QFileDialog, QProgressDialog,
+    QDateEdit, QInputDialog, QCheckBox, QTableWidget, QTableWidgetItem
 )
-from PyQt5.QtGui import QIcon, QPixmap, QDesktopServices, QKeySequence, QPainter, QBrush
-from PyQt5.QtCore import QUrl, Qt, QTimer
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import pandas as pd
-from fpdf import FPDF
-import matplotlib.pyplot as plt
+from PyQt5.QtGui import QIcon, QPixmap, QDesktopServices, QKeySequence, QPainter, QBrush, QFont
+from PyQt5.QtCore import QUrl, Qt, QTimer, QThread, QObject, pyqtSignal, QDate, QEvent
+
+# pandas, matplotlib y fpdf se importan bajo demanda (ver iniciar_graficos):
+# la ventana aparece antes y el arranque en frío es mucho más rápido
+
+# Periodos predefinidos del selector de rango del gráfico (None = todo)
+PERIODOS_GRAFICO = {
+    "Todo el historial": None,
+    "Últimos 7 días": 7,
+    "Últimos 30 días": 30,
+    "Últimos 90 días": 90,
+    "Último año": 365,
+    "Personalizado": None,
+}
+
+from perfiles import ARCHIVO, CatalogoPerfiles
 
-ARCHIVO = "registro_sintomas.csv"
-CARPETA_REPORTES = "reportes"
+# "sqlite" (por defecto) o "csv" para seguir usando solo el archivo de texto
+TIPO_ALMACENAMIENTO = os.environ.get("MIS_ALERGIAS_ALMACENAMIENTO", "sqlite")
+# Gráfico del informe: "png" (por defecto) a la resolución indicada o "svg" (vectorial, más lento)
+FORMATO_GRAFICO_PDF = os.environ.get("MIS_ALERGIAS_GRAFICO_PDF", "png")
+DPI_GRAFICO_PDF = int(os.environ.get("MIS_ALERGIAS_DPI_GRAFICO", "150"))
+# Espera tras el último guardado antes de forzar a disco el diario de escrituras
+INTERVALO_FSYNC_MS = 2000
+# Las peticiones de redibujado dentro de este margen se agrupan en una sola
+ESPERA_REDIBUJADO_MS = 30
+# tight_layout() se recalcula cuando el lienzo lleva este tiempo sin cambiar de tamaño
+ESPERA_MARGENES_MS = 150
+# La búsqueda se lanza cuando se deja de escribir durante este tiempo
+ESPERA_BUSQUEDA_MS = 250
+
+def liberar_memoria():
+    """Recoger los ciclos pendientes y devolver al sistema la memoria libre (glibc)"""
+    import gc
+    gc.collect()
+    if sys.platform.startswith("linux"):
+        import ctypes
+        try:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
 
 class AboutDialog(QDialog):
     def __init__(self):
@@ -79,13 +138,242 @@ class AboutDialog(QDialog):
         close_btn.clicked.connect(self.close)
         layout.addWidget(close_btn)
 
+class RendimientoDialog(QDialog):
+    """Tiempos medidos por la instrumentación, contadores y perfil de cProfile"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Rendimiento - Mis alergias y Yo")
+        self.resize(720, 520)
+        self.setWindowIcon(QIcon("img/logo.png"))
+        self.perfil = ""
+        
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+        
+        self.medir_check = QCheckBox("Medir tiempos de carga, gráficos y exportación")
+        self.medir_check.setChecked(instrumentacion.activa())
+        self.medir_check.toggled.connect(self.cambiar_medicion)
+        layout.addWidget(self.medir_check)
+        
+        self.perfilar_check = QCheckBox("Perfilar con cProfile (más lento mientras está activo)")
+        self.perfilar_check.setChecked(instrumentacion.perfilando())
+        self.perfilar_check.toggled.connect(self.cambiar_perfilado)
+        layout.addWidget(self.perfilar_check)
+        
+        self.texto = QTextEdit()
+        self.texto.setReadOnly(True)
+        self.texto.setFont(QFont("Monospace", 9))
+        self.texto.setLineWrapMode(QTextEdit.NoWrap)
+        layout.addWidget(self.texto)
+        
+        botones = QHBoxLayout()
+        for texto, accion in (("Actualizar", self.actualizar), ("Reiniciar", self.reiniciar),
+                              ("Exportar JSON...", self.exportar), ("Cerrar", self.close)):
+            boton = QPushButton(texto)
+            boton.clicked.connect(accion)
+            botones.addWidget(boton)
+        layout.addLayout(botones)
+        
+        self.actualizar()
+
+    def cambiar_medicion(self, activa):
+        instrumentacion.activar(activa)
+        self.actualizar()
+
+    def cambiar_perfilado(self, activo):
+        if activo:
+            self.medir_check.setChecked(True)
+            instrumentacion.iniciar_perfilado()
+        else:
+            self.perfil = instrumentacion.detener_perfilado()
+        self.actualizar()
+
+    def actualizar(self):
+        texto = instrumentacion.describir()
+        if not instrumentacion.activa():
+            texto = "La medición está desactivada.\n\n" + texto
+        if self.perfil:
+            texto += "\n\n" + self.perfil
+        self.texto.setPlainText(texto)
+
+    def reiniciar(self):
+        instrumentacion.reiniciar()
+        self.perfil = ""
+        self.actualizar()
+
+    def exportar(self):
+        nombre = f"rendimiento_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        ruta, _ = QFileDialog.getSaveFileName(self, "Exportar medidas", nombre, "JSON (*.json)")
+        if not ruta:
+            return
+        try:
+            instrumentacion.exportar_json(ruta, self.perfil)
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"❌ No se pudieron guardar las medidas:\n{str(e)}")
+            return
+        QMessageBox.information(self, "Exportado", f"✅ Medidas guardadas en:\n{ruta}")
+
+class BusquedaDialog(QDialog):
+    """Búsqueda en las notas y los medicamentos, con filtros por columna"""
+
+    COLUMNAS = [
+        ("Fecha", "Fecha"), ("Congestion", "Congestión"), ("Picor", "Picor"),
+        ("Dolor", "Dolor"), ("Urticaria", "Urticaria"),
+        ("Otros_Medicamentos", "Otros medicamentos"), ("Notas", "Notas"),
+    ]
+
+    def __init__(self, buscar_registros, parent=None):
+        super().__init__(parent)
+        self.buscar_registros = buscar_registros
+        self.setWindowTitle("Buscar registros - Mis alergias y Yo")
+        self.resize(900, 560)
+        self.setWindowIcon(QIcon("img/logo.png"))
+        
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+        
+        self.consulta = QLineEdit()
+        self.consulta.setPlaceholderText("p. ej.: ibuprofeno Urticaria != no Congestion >= 7")
+        self.consulta.returnPressed.connect(self.buscar)
+        layout.addWidget(self.consulta)
+        
+        ayuda = QLabel(
+            "Las palabras se buscan en las notas y en otros medicamentos (sin distinguir "
+            "mayúsculas ni tildes, y por el principio: «ibupro» encuentra «ibuprofeno»). "
+            "Se pueden añadir condiciones como <i>Congestion &gt;= 7</i>, <i>Dolor &gt;= moderado</i>, "
+            "<i>Urticaria != no</i>, <i>Notas: polen</i> o <i>Fecha &gt;= 01-05-2025</i>; "
+            "los valores con espacios van entre comillas."
+        )
+        ayuda.setWordWrap(True)
+        ayuda.setStyleSheet("color: #555; font-size: 11px;")
+        layout.addWidget(ayuda)
+        
+        self.tabla = QTableWidget(0, len(self.COLUMNAS))
+        self.tabla.setHorizontalHeaderLabels([titulo for _, titulo in self.COLUMNAS])
+        self.tabla.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.tabla.setSelectionBehavior(QTableWidget.SelectRows)
+        self.tabla.horizontalHeader().setStretchLastSection(True)
+        self.tabla.verticalHeader().hide()
+        layout.addWidget(self.tabla)
+        
+        self.estado = QLabel()
+        layout.addWidget(self.estado)
+        
+        close_btn = QPushButton("Cerrar")
+        close_btn.clicked.connect(self.close)
+        layout.addWidget(close_btn)
+        
+        # Mientras se escribe solo se busca al hacer una pausa
+        self.temporizador = QTimer(self)
+        self.temporizador.setSingleShot(True)
+        self.temporizador.setInterval(ESPERA_BUSQUEDA_MS)
+        self.temporizador.timeout.connect(self.buscar)
+        self.consulta.textChanged.connect(self.temporizador.start)
+
+    def buscar(self):
+        self.temporizador.stop()
+        consulta = self.consulta.text().strip()
+        if not consulta:
+            self.tabla.setRowCount(0)
+            self.estado.clear()
+            return
+        
+        inicio = time.perf_counter()
+        try:
+            total, resultados = self.buscar_registros(consulta)
+        except ValueError as e:
+            self.tabla.setRowCount(0)
+            self.estado.setText(f"⚠️ {e}")
+            return
+        milisegundos = (time.perf_counter() - inicio) * 1000
+        
+        self.tabla.setRowCount(len(resultados))
+        for fila, registro in enumerate(resultados.itertuples(index=False)):
+            for columna, (nombre, _) in enumerate(self.COLUMNAS):
+                valor = getattr(registro, nombre)
+                if nombre == "Fecha":
+                    texto = valor.strftime("%d-%m-%Y")
+                elif isinstance(valor, float):
+                    texto = "" if valor != valor else f"{valor:g}"  # NaN
+                else:
+                    texto = "" if valor is None or valor != valor else str(valor)
+                self.tabla.setItem(fila, columna, QTableWidgetItem(texto))
+        self.tabla.resizeColumnsToContents()
+        
+        texto = f"🔎 {total} registro{'' if total == 1 else 's'} ({milisegundos:.0f} ms)"
+        if total > len(resultados):
+            texto += f"; se muestran los {len(resultados)} más recientes"
+        self.estado.setText(texto)
+
+class ExportadorWorker(QObject):
+    """Genera el informe PDF/PNG en un hilo aparte para no bloquear la interfaz"""
+
+    progreso = pyqtSignal(int, str)
+    terminado = pyqtSignal(str)
+    error = pyqtSignal(str)
+    cancelado = pyqtSignal()
+    finalizado = pyqtSignal()
+
+    def __init__(self, almacenamiento, desde, hasta, series, carpeta):
+        super().__init__()
+        self.almacenamiento = almacenamiento
+        self.desde = desde
+        self.hasta = hasta
+        self.series = series
+        self.carpeta = carpeta
+        self._cancelar = threading.Event()
+
+    def cancelar(self):
+        """Pedir la cancelación (se atiende en el siguiente punto de control)"""
+        self._cancelar.set()
+
+    def ejecutar(self):
+        from exportacion import exportar_informe, ExportacionCancelada
+        try:
+            pdf_path = exportar_informe(
+                self.almacenamiento, self.carpeta,
+                desde=self.desde, hasta=self.hasta,
+                series=self.series,
+                progreso=self.progreso.emit,
+                cancelado=self._cancelar.is_set,
+                formato_grafico=FORMATO_GRAFICO_PDF,
+                dpi=DPI_GRAFICO_PDF
+            )
+            self.terminado.emit(pdf_path)
+        except ExportacionCancelada:
+            self.cancelado.emit()
+        except Exception as e:
+            self.error.emit(str(e))
+        finally:
+            self.finalizado.emit()
+
 class SintomasApp(QWidget):
     def __init__(self):
         super().__init__()
         self.tray_icon = None
         self.tray_timer = None
+        self.exportador = None
+        self.hilo_exportacion = None
+        self.dialogo_progreso = None
+        self.almacen = None
+        self.motor_graficos = None
+        self.figure = None
+        self.canvas = None
+        self.toolbar = None
+        self.grafico_pendiente = False
+        self.lienzo_pendiente = False
+        # En la bandeja se libera el gráfico y el historial (ver entrar_en_reposo)
+        self.en_reposo = False
+
+        # Cada perfil tiene su propio historial; se abre el último usado
+        # (o el indicado en MIS_ALERGIAS_PERFIL)
+        self.catalogo = CatalogoPerfiles()
+        self.perfil = os.environ.get("MIS_ALERGIAS_PERFIL") or self.catalogo.ultimo
+        if self.perfil not in self.catalogo.perfiles():
+            self.perfil = self.catalogo.crear(self.perfil)
         
-        self.setWindowTitle("Mis alergias y Yo - Seguimiento Post-Operatorio")
+        self.actualizar_titulo()
         self.setGeometry(100, 100, 1000, 700)  # Ventana más grande por defecto
         
         # Configuración robusta del icono de la aplicación
@@ -113,8 +401,34 @@ class SintomasApp(QWidget):
         main_layout.addWidget(scroll_area)
 
         self.init_ui()
-        self.init_csv()
-        self.graficar()
+        
+        # Los registros guardados van a un diario; el fsync se agrupa y se
+        # hace poco después del último guardado, y al salir se vuelca todo
+        self.temporizador_fsync = QTimer(self)
+        self.temporizador_fsync.setSingleShot(True)
+        self.temporizador_fsync.setInterval(INTERVALO_FSYNC_MS)
+        self.temporizador_fsync.timeout.connect(self.sincronizar_diario)
+        QApplication.instance().aboutToQuit.connect(self.detener_exportacion)
+        QApplication.instance().aboutToQuit.connect(self.cerrar_almacen)
+        
+        # Redibujados del gráfico: las peticiones seguidas (guardar, importar,
+        # cambiar de periodo...) se agrupan en un único dibujado, que además
+        # espera mientras la ventana está oculta en la bandeja o minimizada
+        self.temporizador_grafico = QTimer(self)
+        self.temporizador_grafico.setSingleShot(True)
+        self.temporizador_grafico.setInterval(ESPERA_REDIBUJADO_MS)
+        self.temporizador_grafico.timeout.connect(self.redibujar_si_visible)
+        # Al redimensionar (p. ej. al pasar a pantalla completa) los márgenes
+        # se recalculan una sola vez, cuando el tamaño deja de cambiar
+        self.margenes_pendientes = False
+        self.temporizador_margenes = QTimer(self)
+        self.temporizador_margenes.setSingleShot(True)
+        self.temporizador_margenes.setInterval(ESPERA_MARGENES_MS)
+        self.temporizador_margenes.timeout.connect(self.ajustar_margenes)
+        
+        # El historial y los gráficos se cargan cuando el bucle de eventos ya
+        # ha arrancado, para que el formulario se muestre cuanto antes
+        QTimer.singleShot(0, self.iniciar_graficos)
 
     def configurar_icono_aplicacion(self):
         """Configuración robusta del icono para múltiples plataformas"""
@@ -223,11 +537,32 @@ class SintomasApp(QWidget):
         self.raise_()
         self.activateWindow()
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.en_reposo:
+            # Se reconstruye después de pintar la ventana, no antes
+            self.en_reposo = False
+            QTimer.singleShot(0, self.salir_de_reposo)
+        self.reanudar_grafico()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange and not self.isMinimized():
+            self.reanudar_grafico()
+
+    def reanudar_grafico(self):
+        """Hacer el dibujado que se aplazó mientras la ventana no se veía"""
+        if self.grafico_pendiente:
+            self.temporizador_grafico.start()
+        elif self.lienzo_pendiente:
+            self.canvas.draw_idle()
+
     def closeEvent(self, event):
         """Manejar el cierre de la ventana"""
         if self.tray_icon and self.tray_icon.isVisible():
             # Minimizar a bandeja en lugar de cerrar
             self.hide()
+            self.entrar_en_reposo()
             self.tray_icon.showMessage(
                 "Mis Alergias y Yo",
                 "La aplicación se ha minimizado a la bandeja del sistema",
@@ -238,6 +573,41 @@ class SintomasApp(QWidget):
         else:
             event.accept()
 
+    def entrar_en_reposo(self):
+        """Liberar el gráfico y el historial en memoria mientras la ventana
+        está en la bandeja; se reconstruyen al volver a mostrarla"""
+        self.en_reposo = True
+        for temporizador in (self.tray_timer, self.temporizador_grafico, self.temporizador_margenes):
+            if temporizador is not None:
+                temporizador.stop()
+        self.grafico_pendiente = self.lienzo_pendiente = self.margenes_pendientes = False
+        if self.figure is None:
+            return  # Aún no se había cargado nada
+
+        with medir("reposo.entrar"):
+            # Lo anotado en el diario pasa al almacenamiento antes de soltarlo
+            self.cerrar_almacen()
+            for widget in (self.toolbar, self.canvas):
+                self.layout_grafico.removeWidget(widget)
+                widget.deleteLater()
+            self.figure.clear()
+            self.figure = self.canvas = self.toolbar = self.dibujo_grafico = None
+            self.almacen = self.motor_graficos = None
+            self.analitica = self.analizador_suspensiones = None
+            self.indice_busqueda = None
+            if self.dialogo_busqueda is not None:
+                self.dialogo_busqueda.close()
+
+            self.cargando_label = QLabel("⏳ Cargando historial y gráficos...")
+            self.cargando_label.setAlignment(Qt.AlignCenter)
+            self.layout_grafico.addWidget(self.cargando_label)
+            liberar_memoria()
+        print("💤 En la bandeja: gráfico e historial liberados hasta volver a mostrar la ventana")
+
+    def salir_de_reposo(self):
+        with medir("reposo.salir"):
+            self.iniciar_graficos()
+
     def salir_aplicacion(self):
         """Salir completamente de la aplicación"""
         if self.tray_icon:
@@ -309,12 +679,35 @@ class SintomasApp(QWidget):
         
         archivo_menu.addSeparator()
         
+        # Acciones Importar/Exportar CSV (compatibilidad con el formato original)
+        importar_csv_action = QAction('Importar CSV...', self)
+        importar_csv_action.triggered.connect(self.importar_csv)
+        archivo_menu.addAction(importar_csv_action)
+        
+        exportar_csv_action = QAction('Exportar CSV...', self)
+        exportar_csv_action.triggered.connect(self.exportar_csv)
+        archivo_menu.addAction(exportar_csv_action)
+        
+        archivo_menu.addSeparator()
+        
         # Acción Salir
         salir_action = QAction('Salir', self)
         salir_action.setShortcut('Ctrl+Q')
         salir_action.triggered.connect(self.salir_aplicacion)
         archivo_menu.addAction(salir_action)
         
+        # Menú Perfil
+        perfil_menu = menubar.addMenu('Perfil')
+        
+        cambiar_perfil_action = QAction('Cambiar de perfil...', self)
+        cambiar_perfil_action.setShortcut('Ctrl+P')
+        cambiar_perfil_action.triggered.connect(self.cambiar_perfil)
+        perfil_menu.addAction(cambiar_perfil_action)
+        
+        nuevo_perfil_action = QAction('Nuevo perfil...', self)
+        nuevo_perfil_action.triggered.connect(self.nuevo_perfil)
+        perfil_menu.addAction(nuevo_perfil_action)
+        
         # Menú Ver
         ver_menu = menubar.addMenu('Ver')
         
@@ -330,6 +723,24 @@ class SintomasApp(QWidget):
         ventana_normal_action.triggered.connect(self.ventana_normal)
         ver_menu.addAction(ventana_normal_action)
         
+        ver_menu.addSeparator()
+        
+        # Acción Buscar
+        buscar_action = QAction('Buscar registros...', self)
+        buscar_action.setShortcut('Ctrl+F')
+        buscar_action.triggered.connect(self.mostrar_busqueda)
+        ver_menu.addAction(buscar_action)
+        
+        # Acción Análisis de medicamentos
+        analisis_action = QAction('Efecto de suspender medicamentos...', self)
+        analisis_action.triggered.connect(self.mostrar_analisis_suspensiones)
+        ver_menu.addAction(analisis_action)
+        
+        # Acción Rendimiento
+        rendimiento_action = QAction('Rendimiento...', self)
+        rendimiento_action.triggered.connect(self.mostrar_rendimiento)
+        ver_menu.addAction(rendimiento_action)
+        
         # Menú Ayuda
         ayuda_menu = menubar.addMenu('Ayuda')
         
@@ -352,6 +763,26 @@ class SintomasApp(QWidget):
         dialog = AboutDialog()
         dialog.exec_()
 
+    def mostrar_rendimiento(self):
+        dialog = RendimientoDialog(self)
+        dialog.exec_()
+
+    def mostrar_busqueda(self):
+        self.iniciar_graficos()
+        if self.dialogo_busqueda is None:
+            self.dialogo_busqueda = BusquedaDialog(self.buscar_registros, self)
+        self.dialogo_busqueda.show()
+        self.dialogo_busqueda.raise_()
+        self.dialogo_busqueda.activateWindow()
+
+    def buscar_registros(self, consulta):
+        from busqueda import IndiceBusqueda
+        
+        if self.indice_busqueda is None:
+            # Se construye con la primera búsqueda; después solo indexa lo nuevo
+            self.indice_busqueda = IndiceBusqueda()
+        return self.indice_busqueda.buscar(self.almacen, consulta)
+
     def init_ui(self):
         self.label_info = QLabel("Mis alergias y Yo - Seguimiento de recuperación post-operatoria:")
         self.label_info.setStyleSheet("font-weight: bold; font-size: 16px; margin: 15px 0; color: #2c3e50; text-align: center;")
@@ -493,24 +924,203 @@ class SintomasApp(QWidget):
         self.exportar_btn.clicked.connect(self.exportar_pdf)
         self.layout.addWidget(self.exportar_btn)
 
+        self.dibujo_grafico = None
+        self.ajustando_grafico = False
+        self.rango_grafico = None
+        # Selector del rango de fechas que se carga y se dibuja
+        rango_layout = QHBoxLayout()
+        rango_layout.addWidget(QLabel("Periodo del gráfico:"))
+        self.periodo_grafico = QComboBox()
+        self.periodo_grafico.addItems(list(PERIODOS_GRAFICO))
+        self.periodo_grafico.currentTextChanged.connect(self.cambiar_periodo_grafico)
+        rango_layout.addWidget(self.periodo_grafico)
+        
+        hoy = QDate.currentDate()
+        self.desde_grafico = QDateEdit(hoy.addDays(-29))
+        self.hasta_grafico = QDateEdit(hoy)
+        for etiqueta, editor in (("Desde:", self.desde_grafico), ("Hasta:", self.hasta_grafico)):
+            editor.setCalendarPopup(True)
+            editor.setDisplayFormat("dd-MM-yyyy")
+            editor.setEnabled(False)
+            rango_layout.addWidget(QLabel(etiqueta))
+            rango_layout.addWidget(editor)
+        
+        self.aplicar_rango_btn = QPushButton("Aplicar")
+        self.aplicar_rango_btn.setEnabled(False)
+        self.aplicar_rango_btn.clicked.connect(self.aplicar_rango_grafico)
+        rango_layout.addWidget(self.aplicar_rango_btn)
+        self.layout.addLayout(rango_layout)
+        
+        # Contenedor del gráfico: el lienzo se crea en iniciar_graficos()
+        self.contenedor_grafico = QWidget()
+        self.contenedor_grafico.setMinimumHeight(400)  # Altura mínima para el gráfico
+        self.layout_grafico = QVBoxLayout(self.contenedor_grafico)
+        self.cargando_label = QLabel("⏳ Cargando historial y gráficos...")
+        self.cargando_label.setAlignment(Qt.AlignCenter)
+        self.layout_grafico.addWidget(self.cargando_label)
+        self.layout.addWidget(self.contenedor_grafico)
+        
+        # Medias, extremos y tendencia de los últimos 7 y 30 días
+        self.analitica = None
+        self.analizador_suspensiones = None
+        self.indice_busqueda = None
+        self.dialogo_busqueda = None
+        self.tendencias_label = QLabel()
+        self.tendencias_label.setStyleSheet(
+            "background-color: #f5f5f5; border: 1px solid #ccc; "
+            "padding: 8px; border-radius: 6px; font-size: 11px;"
+        )
+        self.tendencias_label.setWordWrap(True)
+        self.tendencias_label.hide()
+        self.layout.addWidget(self.tendencias_label)
+
+    def iniciar_graficos(self):
+        """Importar la pila de gráficos, cargar el historial y dibujar por primera vez"""
+        if self.figure is not None or self.en_reposo:
+            return
+        # Pintar el formulario antes de bloquear con las importaciones pesadas
+        QApplication.processEvents()
+        marcar_fase("Ventana visible")
+        
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+        from graficos import MotorGraficos
+        marcar_fase("Importar pandas y matplotlib")
+        
+        self.motor_graficos = MotorGraficos()
         self.figure = Figure(figsize=(12, 8))  # Gráfico más grande
         self.canvas = FigureCanvas(self.figure)
-        self.canvas.setMinimumHeight(400)  # Altura mínima para el gráfico
-        self.layout.addWidget(self.canvas)
+        # Todos los dibujados pasan por draw(), también los diferidos de draw_idle()
+        self.dibujar_lienzo_qt = self.canvas.draw
+        self.canvas.draw = medido("grafico.canvas_draw")(self.dibujar_lienzo)
+        self.canvas.mpl_connect('resize_event', self.lienzo_redimensionado)
+        
+        # Barra de navegación: zoom y desplazamiento sobre el gráfico
+        self.toolbar = NavigationToolbar(self.canvas, self)
+        self.layout_grafico.removeWidget(self.cargando_label)
+        self.cargando_label.deleteLater()
+        self.layout_grafico.addWidget(self.toolbar)
+        self.layout_grafico.addWidget(self.canvas)
+        
+        self.init_csv()
+        marcar_fase("Cargar historial")
+        
+        self.graficar()
+        marcar_fase("Primer gráfico", ultima=True)
 
     def init_csv(self):
-        if not os.path.exists(ARCHIVO):
-            with open(ARCHIVO, mode='w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow([
-                    "Fecha", "Congestion", "Picor", "Dolor", "Secrecion", 
-                    "Dificultad_Respirar", "Tos", "Estornudos", "Erupciones", 
-                    "Urticaria", "Hinchazón", "Respibien_Suspendido", 
-                    "Utabon_Suspendido", "Otros_Medicamentos", "Dias_PostOp", 
-                    "Mejoria_Respiracion", "Notas"
-                ])
+        from almacen import AlmacenSintomas
+        from almacenamiento import crear_almacenamiento
+        from diario import DiarioEscrituras, ruta_diario
+        
+        # El historial se lee una única vez; después se mantiene en memoria.
+        # Con SQLite, el CSV existente se migra automáticamente la primera vez.
+        ruta_csv, ruta_sqlite, _ = self.catalogo.rutas(self.perfil)
+        almacenamiento = crear_almacenamiento(TIPO_ALMACENAMIENTO, ruta_csv, ruta_sqlite)
+        diario = DiarioEscrituras(almacenamiento, ruta_diario(almacenamiento.ruta))
+        self.almacen = AlmacenSintomas(almacenamiento, diario)
+        self.almacen.cargar()
+        self.actualizar_catalogo()
+        
+        from analitica import AnaliticaSintomas
+        self.analitica = AnaliticaSintomas()
+        self.actualizar_tendencias()
+        # El análisis de suspensiones y el índice de búsqueda eran del historial anterior
+        self.analizador_suspensiones = None
+        self.indice_busqueda = None
+
+    def sincronizar_diario(self):
+        if self.almacen is not None:
+            self.almacen.sincronizar()
+
+    def cerrar_almacen(self):
+        """Volcar al almacenamiento lo que quede en el diario"""
+        self.temporizador_fsync.stop()
+        if self.almacen is not None:
+            self.almacen.compactar()
+
+    def actualizar_catalogo(self):
+        """Reflejar en el catálogo de perfiles el tamaño y las fechas del historial"""
+        fechas = self.almacen.df['Fecha']
+        if fechas.empty:
+            self.catalogo.actualizar(self.perfil, 0)
+        else:
+            self.catalogo.actualizar(self.perfil, len(fechas), fechas.iloc[0], fechas.iloc[-1])
+
+    def actualizar_tendencias(self):
+        """Refrescar el panel de tendencias (solo procesa los registros nuevos)"""
+        from analitica import describir_resumen
+        
+        self.analitica.sincronizar(self.almacen)
+        lineas = describir_resumen(self.analitica.resumen())
+        if not lineas:
+            self.tendencias_label.hide()
+            return
+        self.tendencias_label.setText(
+            "<b>📈 Tendencias (días hasta el último registro)</b><br>" + "<br>".join(lineas)
+        )
+        self.tendencias_label.show()
+
+    def mostrar_analisis_suspensiones(self):
+        self.iniciar_graficos()
+        from suspensiones import AnalizadorSuspensiones, describir_analisis
+        
+        if self.analizador_suspensiones is None:
+            self.analizador_suspensiones = AnalizadorSuspensiones()
+        # Se recalcula solo si el historial ha cambiado desde la última vez
+        resultado = self.analizador_suspensiones.analizar(self.almacen)
+        QMessageBox.information(self, "Efecto de suspender medicamentos",
+            "💊 Comparación de los síntomas antes y después de cada suspensión:\n\n"
+            + "\n".join(describir_analisis(resultado)))
+
+    def actualizar_titulo(self):
+        self.setWindowTitle(f"Mis alergias y Yo - Seguimiento Post-Operatorio ({self.perfil})")
+
+    def cambiar_perfil(self):
+        perfiles = list(self.catalogo.perfiles())
+        descripciones = [self.catalogo.descripcion(nombre) for nombre in perfiles]
+        elegido, ok = QInputDialog.getItem(
+            self, "Cambiar de perfil", "Perfil:", descripciones,
+            perfiles.index(self.perfil), False
+        )
+        if ok:
+            self.abrir_perfil(perfiles[descripciones.index(elegido)])
+
+    def nuevo_perfil(self):
+        nombre, ok = QInputDialog.getText(self, "Nuevo perfil", "Nombre de la persona:")
+        if not ok:
+            return
+        try:
+            nombre = self.catalogo.crear(nombre)
+        except ValueError as e:
+            QMessageBox.warning(self, "Perfil no válido", str(e))
+            return
+        self.abrir_perfil(nombre)
+
+    def abrir_perfil(self, nombre):
+        if nombre == self.perfil:
+            return
+        if self.hilo_exportacion is not None:
+            QMessageBox.information(self, "Exportación en curso", "Espera a que termine el informe antes de cambiar de perfil.")
+            return
+
+        self.cerrar_almacen()
+        self.catalogo.seleccionar(nombre)
+        self.perfil = nombre
+        self.actualizar_titulo()
+        if self.figure is None:
+            return  # iniciar_graficos() cargará el perfil elegido
+
+        from graficos import MotorGraficos
+        # Las series en caché pertenecen al historial anterior
+        self.motor_graficos = MotorGraficos()
+        self.init_csv()
+        self.programar_grafico()
+        print(f"👤 Perfil activo: {nombre} ({len(self.almacen)} registros)")
 
     def guardar_sintomas(self):
+        self.iniciar_graficos()
         try:
             fecha = datetime.now().strftime("%d-%m-%Y")
             congestion = int(self.congestion_input.text()) if self.congestion_input.text() else 0
@@ -543,15 +1153,16 @@ class SintomasApp(QWidget):
             if reply != QMessageBox.Yes:
                 return
 
-        with open(ARCHIVO, mode='a', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow([
-                fecha, congestion, picor, dolor, secrecion,
-                dificultad_respirar, tos, estornudos, erupciones,
-                urticaria, hinchazón, respibien_suspendido,
-                utabon_suspendido, otros_medicamentos, dias_postop,
-                mejoria_respiracion, notas
-            ])
+        self.almacen.agregar([
+            fecha, congestion, picor, dolor, secrecion,
+            dificultad_respirar, tos, estornudos, erupciones,
+            urticaria, hinchazón, respibien_suspendido,
+            utabon_suspendido, otros_medicamentos, dias_postop,
+            mejoria_respiracion, notas
+        ])
+        self.temporizador_fsync.start()
+        self.actualizar_catalogo()
+        self.actualizar_tendencias()
 
         QMessageBox.information(self, "Éxito", "Registro guardado correctamente.")
 
@@ -562,298 +1173,285 @@ class SintomasApp(QWidget):
         self.otros_medicamentos.clear()
         self.dias_postop.clear()
         self.notas_input.clear()
-        self.graficar()
+        self.programar_grafico()
+
+    def importar_csv(self):
+        ruta, _ = QFileDialog.getOpenFileName(self, "Importar CSV", "", "Archivos CSV (*.csv)")
+        if not ruta:
+            return
+        self.iniciar_graficos()
+        from almacenamiento import leer_csv
+        try:
+            df = leer_csv(ruta)
+            self.almacen.importar(df)
+            self.actualizar_catalogo()
+            self.actualizar_tendencias()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"❌ No se pudo importar el CSV:\n{str(e)}")
+            return
+
+        QMessageBox.information(self, "Importado", f"✅ Se han importado {len(df)} registros.")
+        self.programar_grafico()
+
+    def exportar_csv(self):
+        ruta, _ = QFileDialog.getSaveFileName(self, "Exportar CSV", ARCHIVO, "Archivos CSV (*.csv)")
+        if not ruta:
+            return
+        self.iniciar_graficos()
+        from almacenamiento import escribir_csv
+        try:
+            # Primero se vuelca el diario: si el destino es el propio historial
+            # CSV, la siguiente compactación volvería a añadir esos registros
+            self.almacen.compactar()
+            escribir_csv(self.almacen.df, ruta)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"❌ No se pudo exportar el CSV:\n{str(e)}")
+            return
+
+        QMessageBox.information(self, "Exportado", f"✅ Historial exportado a:\n{ruta}")
 
+    def cambiar_periodo_grafico(self, periodo):
+        personalizado = periodo == "Personalizado"
+        self.desde_grafico.setEnabled(personalizado)
+        self.hasta_grafico.setEnabled(personalizado)
+        self.aplicar_rango_btn.setEnabled(personalizado)
+        if not personalizado:
+            self.aplicar_rango_grafico()
+
+    def aplicar_rango_grafico(self):
+        """Limitar el gráfico al periodo elegido en el selector"""
+        from graficos import rango_dias
+        
+        periodo = self.periodo_grafico.currentText()
+        if periodo == "Personalizado":
+            desde = self.desde_grafico.date().toPyDate()
+            hasta = self.hasta_grafico.date().toPyDate()
+            if desde > hasta:
+                QMessageBox.warning(self, "Rango no válido", "La fecha inicial debe ser anterior a la final.")
+                return
+            self.rango_grafico = rango_dias(desde, hasta)
+        elif PERIODOS_GRAFICO[periodo] is None:
+            self.rango_grafico = None
+        else:
+            hasta = datetime.now().date()
+            desde = hasta - timedelta(days=PERIODOS_GRAFICO[periodo] - 1)
+            self.rango_grafico = rango_dias(desde, hasta)
+        self.programar_grafico()
+
+    def programar_grafico(self):
+        """Pedir un redibujado; los que lleguen seguidos se hacen una sola vez"""
+        self.grafico_pendiente = True
+        self.temporizador_grafico.start()
+
+    def redibujar_si_visible(self):
+        # Oculta o minimizada no se dibuja: reanudar_grafico() lo hará al volver
+        if self.grafico_pendiente and self.isVisible() and not self.isMinimized():
+            self.graficar()
+
+    def dibujar_lienzo(self):
+        """Render del lienzo (sustituye a canvas.draw, también para draw_idle)"""
+        if not self.isVisible():
+            self.lienzo_pendiente = True
+            return
+        self.lienzo_pendiente = False
+        # Los márgenes se recalculan aquí, justo antes de pintar, salvo si el
+        # lienzo aún está cambiando de tamaño
+        if self.margenes_pendientes and not self.temporizador_margenes.isActive():
+            self.margenes_pendientes = False
+            with medir("grafico.tight_layout"):
+                self.figure.tight_layout()
+        self.dibujar_lienzo_qt()
+
+    def lienzo_redimensionado(self, event):
+        self.margenes_pendientes = True
+        self.temporizador_margenes.start()
+
+    def ajustar_margenes(self):
+        if self.margenes_pendientes:
+            self.canvas.draw_idle()
+
+    @medido("grafico.graficar")
     def graficar(self):
-        self.figure.clear()
+        if self.figure is None:
+            return  # Todavía cargando: iniciar_graficos() dibujará al terminar
+        self.grafico_pendiente = False
+        from graficos import dibujar, actualizar_dibujo, ESTILO_PANTALLA, MAX_PUNTOS_PANTALLA
         
         try:
-            df = pd.read_csv(ARCHIVO)
+            df = self.almacen.df
             if df.empty:
+                self.dibujo_grafico = None
+                self.figure.clear()
                 ax = self.figure.add_subplot(111)
                 ax.text(0.5, 0.5, "No hay datos para mostrar", ha='center', va='center')
                 self.canvas.draw()
                 return
-                
-            df['Fecha'] = pd.to_datetime(df['Fecha'], format='%d-%m-%Y')
-            df.sort_values(by='Fecha', inplace=True)
-            
-            # Crear subgráficos
-            ax1 = self.figure.add_subplot(2, 2, 1)
-            ax2 = self.figure.add_subplot(2, 2, 2)
-            ax3 = self.figure.add_subplot(2, 2, 3)
-            ax4 = self.figure.add_subplot(2, 2, 4)
             
-            # Gráfico 1: Síntomas nasales principales
-            ax1.plot(df['Fecha'], df['Congestion'], marker='o', label='Congestión', color='red')
-            ax1.plot(df['Fecha'], df['Picor'], marker='s', label='Picor', color='orange')
-            if 'Estornudos' in df.columns:
-                ax1.plot(df['Fecha'], df['Estornudos'], marker='^', label='Estornudos', color='blue')
-            ax1.set_title("Síntomas Nasales")
-            ax1.set_ylabel("Intensidad (0-10)")
-            ax1.legend(fontsize=8)
-            ax1.tick_params(axis='x', rotation=45, labelsize=8)
+            # Solo se cargan los registros del periodo elegido y, con
+            # historiales largos, se dibuja un resumen (nivel de detalle)
+            desde, hasta = self.rango_grafico or (None, None)
+            series = self.motor_graficos.series(self.almacen, desde, hasta)
+            series = series.reducir(MAX_PUNTOS_PANTALLA)
             
-            # Gráfico 2: Estado de medicamentos (días desde suspensión)
-            respibien_days = []
-            utabon_days = []
-            
-            for _, row in df.iterrows():
-                # Convertir texto de suspensión a días
-                resp_val = 0
-                uta_val = 0
+            self.ajustando_grafico = True
+            try:
+                # Si los paneles ya están dibujados basta con cambiar los
+                # datos de sus líneas y pedir un redibujado diferido
+                if self.dibujo_grafico and actualizar_dibujo(self.dibujo_grafico, series):
+                    self.ajustar_eje_al_rango()
+                    self.resolver_limites()
+                    self.canvas.draw_idle()
+                    return
                 
-                if 'Respibien_Suspendido' in df.columns:
-                    resp_text = str(row['Respibien_Suspendido'])
-                    if 'hoy' in resp_text: resp_val = 0
-                    elif '1 día' in resp_text: resp_val = 1
-                    elif '2-3 días' in resp_text: resp_val = 2.5
-                    elif '>3 días' in resp_text: resp_val = 5
-                    
-                if 'Utabon_Suspendido' in df.columns:
-                    uta_text = str(row['Utabon_Suspendido'])
-                    if 'hoy' in uta_text: uta_val = 0
-                    elif '1 día' in uta_text: uta_val = 1
-                    elif '2-3 días' in uta_text: uta_val = 2.5
-                    elif '>3 días' in uta_text: uta_val = 5
-                    
-                respibien_days.append(resp_val)
-                utabon_days.append(uta_val)
-            
-            ax2.plot(df['Fecha'], respibien_days, marker='o', label='Respibien', color='green')
-            ax2.plot(df['Fecha'], utabon_days, marker='s', label='Utabon', color='purple')
-            ax2.set_title("Días desde suspensión")
-            ax2.set_ylabel("Días")
-            ax2.legend(fontsize=8)
-            ax2.tick_params(axis='x', rotation=45, labelsize=8)
-            
-            # Gráfico 3: Síntomas sistémicos (presencia/ausencia)
-            if 'Dias_PostOp' in df.columns:
-                ax3.plot(df['Fecha'], df['Dias_PostOp'], marker='d', label='Días post-op', color='brown')
-                ax3.set_title("Recuperación Post-operatoria")
-                ax3.set_ylabel("Días desde operación")
-                ax3.legend(fontsize=8)
-                ax3.tick_params(axis='x', rotation=45, labelsize=8)
-            
-            # Gráfico 4: Resumen de mejora
-            dolor_numeric = []
-            for _, row in df.iterrows():
-                dolor_val = 0
-                if 'Dolor' in df.columns:
-                    dolor_text = str(row['Dolor']).lower()
-                    if 'leve' in dolor_text: dolor_val = 2
-                    elif 'moderado' in dolor_text: dolor_val = 5
-                    elif 'severo' in dolor_text: dolor_val = 8
-                dolor_numeric.append(dolor_val)
-            
-            ax4.plot(df['Fecha'], dolor_numeric, marker='x', label='Dolor', color='red')
-            ax4.set_title("Evolución del Dolor")
-            ax4.set_ylabel("Intensidad")
-            ax4.legend(fontsize=8)
-            ax4.tick_params(axis='x', rotation=45, labelsize=8)
-            
-            self.figure.tight_layout()
+                # tight_layout() se hace al pintar el lienzo (ver dibujar_lienzo)
+                self.dibujo_grafico = dibujar(self.figure, series, ESTILO_PANTALLA, ajustar=False)
+                self.margenes_pendientes = True
+                self.ajustar_eje_al_rango()
+                self.resolver_limites()
+                self.toolbar.update()  # El botón "Inicio" vuelve a esta vista
+            finally:
+                self.ajustando_grafico = False
+            self.dibujo_grafico.ejes[0].callbacks.connect('xlim_changed', self.zoom_grafico)
             
         except Exception as e:
+            self.dibujo_grafico = None
+            self.figure.clear()
             ax = self.figure.add_subplot(111)
             ax.text(0.5, 0.5, f"Error al generar gráfico:\n{str(e)}", ha='center', va='center')
 
         self.canvas.draw()
 
-    def exportar_pdf(self):
+    def resolver_limites(self):
+        # matplotlib calcula los límites automáticos de forma perezosa, en el
+        # primer dibujado; se fuerzan aquí, con ajustando_grafico activo, para
+        # que ese xlim_changed no se tome por un zoom del usuario
+        for ax in self.dibujo_grafico.ejes:
+            ax.get_xlim()
+            ax.get_ylim()
+
+    def ajustar_eje_al_rango(self):
+        if self.rango_grafico:
+            self.dibujo_grafico.ejes[0].set_xlim(*self.rango_grafico)
+
+    def zoom_grafico(self, ax):
+        """Cargar y dibujar solo los registros del rango visible tras un zoom o desplazamiento"""
+        if self.ajustando_grafico or not self.dibujo_grafico:
+            return
+        from graficos import rango_visible, actualizar_dibujo, MAX_PUNTOS_PANTALLA
+        
+        desde, hasta = rango_visible(ax)
+        self.rango_grafico = (desde, hasta)
+        series = self.motor_graficos.series(self.almacen, desde, hasta)
+        self.ajustando_grafico = True
         try:
-            if not os.path.exists(CARPETA_REPORTES):
-                os.makedirs(CARPETA_REPORTES)
+            actualizar_dibujo(self.dibujo_grafico, series.reducir(MAX_PUNTOS_PANTALLA), escalar_x=False)
+        finally:
+            self.ajustando_grafico = False
+        
+        # Reflejar el rango visible en el selector sin volver a dibujar
+        for widget in (self.periodo_grafico, self.desde_grafico, self.hasta_grafico):
+            widget.blockSignals(True)
+        self.periodo_grafico.setCurrentText("Personalizado")
+        self.desde_grafico.setDate(QDate(desde.item().date()))
+        self.hasta_grafico.setDate(QDate(hasta.item().date()))
+        for widget in (self.periodo_grafico, self.desde_grafico, self.hasta_grafico):
+            widget.setEnabled(True)
+            widget.blockSignals(False)
+        self.aplicar_rango_btn.setEnabled(True)
+        
+        self.canvas.draw_idle()
 
-            df = pd.read_csv(ARCHIVO)
-            
-            if df.empty:
-                QMessageBox.warning(self, "Advertencia", "No hay datos para exportar.")
-                return
+    def exportar_pdf(self):
+        self.iniciar_graficos()
+        if self.hilo_exportacion is not None:
+            QMessageBox.information(self, "Exportación en curso", "Ya se está generando un informe, espera a que termine.")
+            return
 
-            # Crear una figura nueva para PDF usando la misma lógica que la interfaz
-            fig = plt.figure(figsize=(16, 12))
-            df['Fecha'] = pd.to_datetime(df['Fecha'], format='%d-%m-%Y')
-            df.sort_values(by='Fecha', inplace=True)
-            
-            # Crear los 4 subgráficos exactamente como en la interfaz
-            ax1 = fig.add_subplot(2, 2, 1)
-            ax2 = fig.add_subplot(2, 2, 2)
-            ax3 = fig.add_subplot(2, 2, 3)
-            ax4 = fig.add_subplot(2, 2, 4)
-            
-            # Gráfico 1: Síntomas nasales principales (igual que en graficar())
-            ax1.plot(df['Fecha'], df['Congestion'], marker='o', label='Congestión', color='red')
-            ax1.plot(df['Fecha'], df['Picor'], marker='s', label='Picor', color='orange')
-            if 'Estornudos' in df.columns:
-                ax1.plot(df['Fecha'], df['Estornudos'], marker='^', label='Estornudos', color='blue')
-            ax1.set_title("Síntomas Nasales", fontsize=14, fontweight='bold')
-            ax1.set_ylabel("Intensidad (0-10)")
-            ax1.legend(fontsize=10)
-            ax1.tick_params(axis='x', rotation=45, labelsize=10)
-            ax1.grid(True, alpha=0.3)
-            
-            # Gráfico 2: Estado de medicamentos (igual que en graficar())
-            respibien_days = []
-            utabon_days = []
-            
-            for _, row in df.iterrows():
-                resp_val = 0
-                uta_val = 0
-                
-                if 'Respibien_Suspendido' in df.columns:
-                    resp_text = str(row['Respibien_Suspendido'])
-                    if 'hoy' in resp_text: resp_val = 0
-                    elif '1 día' in resp_text: resp_val = 1
-                    elif '2-3 días' in resp_text: resp_val = 2.5
-                    elif '>3 días' in resp_text: resp_val = 5
-                    
-                if 'Utabon_Suspendido' in df.columns:
-                    uta_text = str(row['Utabon_Suspendido'])
-                    if 'hoy' in uta_text: uta_val = 0
-                    elif '1 día' in uta_text: uta_val = 1
-                    elif '2-3 días' in uta_text: uta_val = 2.5
-                    elif '>3 días' in uta_text: uta_val = 5
-                    
-                respibien_days.append(resp_val)
-                utabon_days.append(uta_val)
-            
-            ax2.plot(df['Fecha'], respibien_days, marker='o', label='Respibien', color='green')
-            ax2.plot(df['Fecha'], utabon_days, marker='s', label='Utabon', color='purple')
-            ax2.set_title("Días desde suspensión", fontsize=14, fontweight='bold')
-            ax2.set_ylabel("Días")
-            ax2.legend(fontsize=10)
-            ax2.tick_params(axis='x', rotation=45, labelsize=10)
-            ax2.grid(True, alpha=0.3)
-            
-            # Gráfico 3: Recuperación Post-operatoria (igual que en graficar())
-            if 'Dias_PostOp' in df.columns and not df['Dias_PostOp'].isna().all():
-                ax3.plot(df['Fecha'], df['Dias_PostOp'], marker='d', label='Días post-op', color='brown', linewidth=2)
-                ax3.set_title("Recuperación Post-operatoria", fontsize=14, fontweight='bold')
-                ax3.set_ylabel("Días desde operación")
-                ax3.legend(fontsize=10)
-                ax3.tick_params(axis='x', rotation=45, labelsize=10)
-                ax3.grid(True, alpha=0.3)
-            else:
-                ax3.text(0.5, 0.5, "No hay datos\npost-operatorios", ha='center', va='center', 
-                        fontsize=12, transform=ax3.transAxes)
-                ax3.set_title("Recuperación Post-operatoria", fontsize=14, fontweight='bold')
-            
-            # Gráfico 4: Evolución del Dolor (igual que en graficar())
-            dolor_numeric = []
-            for _, row in df.iterrows():
-                dolor_val = 0
-                if 'Dolor' in df.columns:
-                    dolor_text = str(row['Dolor']).lower()
-                    if 'leve' in dolor_text: dolor_val = 2
-                    elif 'moderado' in dolor_text: dolor_val = 5
-                    elif 'severo' in dolor_text: dolor_val = 8
-                dolor_numeric.append(dolor_val)
-            
-            ax4.plot(df['Fecha'], dolor_numeric, marker='x', label='Dolor', color='red', linewidth=2, markersize=8)
-            ax4.set_title("Evolución del Dolor", fontsize=14, fontweight='bold')
-            ax4.set_ylabel("Intensidad")
-            ax4.legend(fontsize=10)
-            ax4.tick_params(axis='x', rotation=45, labelsize=10)
-            ax4.grid(True, alpha=0.3)
-            
-            # Ajustar el layout para mejor apariencia
-            plt.tight_layout(pad=3.0)
-
-            # Guardar imagen
-            fecha_actual = datetime.now().strftime('%Y%m%d_%H%M%S')
-            img_path = os.path.join(CARPETA_REPORTES, f"grafico_sintomas_{fecha_actual}.png")
-            pdf_path = os.path.join(CARPETA_REPORTES, f"historial_sintomas_{fecha_actual}.pdf")
-
-            plt.savefig(img_path, dpi=300, bbox_inches='tight', facecolor='white', edgecolor='none')
-            plt.close()
-
-            # Crear PDF
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font("Arial", size=16)
-            pdf.cell(200, 10, txt="Mis alergias y Yo", ln=True, align='C')
-            pdf.set_font("Arial", size=12)
-            pdf.cell(200, 8, txt="Seguimiento de Recuperación Post-Operatoria", ln=True, align='C')
-            pdf.cell(200, 6, txt="Alergia Medicamentosa - Descongestivos Nasales", ln=True, align='C')
-            pdf.ln(10)
-
-            # Resumen
-            pdf.set_font("Arial", size=10)
-            pdf.cell(200, 6, txt=f"Reporte generado: {datetime.now().strftime('%d-%m-%Y %H:%M')}", ln=True)
-            pdf.cell(200, 6, txt=f"Total de registros: {len(df)}", ln=True)
-            
-            # Estadísticas resumidas
-            if not df.empty:
-                congestion_promedio = df['Congestion'].mean()
-                picor_promedio = df['Picor'].mean()
-                pdf.cell(200, 6, txt=f"Congestión promedio: {congestion_promedio:.1f} | Picor promedio: {picor_promedio:.1f}", ln=True)
-            
-            pdf.ln(5)
+        # El informe lee directamente del almacenamiento: primero se vuelca el diario
+        self.almacen.compactar()
+        
+        # El informe cubre el mismo periodo que muestra el gráfico
+        desde, hasta = self.rango_grafico or (None, None)
+        if self.almacen.rango(desde, hasta).empty:
+            QMessageBox.warning(self, "Advertencia", "No hay datos para exportar en el periodo seleccionado.")
+            return
 
-            # Detalles de cada registro
-            pdf.set_font("Arial", size=8)
-            for index, row in df.iterrows():
-                fecha_str = row['Fecha'] if isinstance(row['Fecha'], str) else row['Fecha'].strftime('%d-%m-%Y')
-                
-                # Información básica
-                texto_basico = f"FECHA: {fecha_str} | Congestión: {row['Congestion']} | Picor: {row['Picor']} | Dolor: {row['Dolor']} | Secreción: {row['Secrecion']}"
-                pdf.multi_cell(0, 4, texto_basico)
-                
-                # Información de medicamentos
-                if 'Respibien_Suspendido' in df.columns and 'Utabon_Suspendido' in df.columns:
-                    texto_med = f"Medicamentos - Respibien: {row['Respibien_Suspendido']} | Utabon: {row['Utabon_Suspendido']}"
-                    if 'Otros_Medicamentos' in df.columns and str(row['Otros_Medicamentos']) != 'nan' and row['Otros_Medicamentos']:
-                        texto_med += f" | Otros: {row['Otros_Medicamentos']}"
-                    pdf.multi_cell(0, 4, texto_med)
-                
-                # Síntomas respiratorios
-                if 'Dificultad_Respirar' in df.columns:
-                    texto_resp = f"Respiratorio - Dificultad: {row['Dificultad_Respirar']} | Tos: {row['Tos']} | Estornudos: {row['Estornudos']}"
-                    pdf.multi_cell(0, 4, texto_resp)
-                
-                # Síntomas cutáneos
-                if 'Erupciones' in df.columns:
-                    texto_cutaneo = f"Cutáneo - Erupciones: {row['Erupciones']} | Urticaria: {row['Urticaria']} | Hinchazón: {row['Hinchazón']}"
-                    pdf.multi_cell(0, 4, texto_cutaneo)
-                
-                # Información post-operatoria
-                if 'Dias_PostOp' in df.columns:
-                    texto_postop = f"Post-op - Días: {row['Dias_PostOp']} | Mejoría respiratoria: {row['Mejoria_Respiracion']}"
-                    pdf.multi_cell(0, 4, texto_postop)
-                
-                # Notas
-                if 'Notas' in df.columns and str(row['Notas']) != 'nan' and row['Notas']:
-                    pdf.multi_cell(0, 4, f"Notas: {row['Notas']}")
-                
-                pdf.ln(2)
+        # El hilo lee los registros del almacenamiento por lotes; para el
+        # historial completo se reutilizan las series del gráfico en pantalla
+        series = self.motor_graficos.series(self.almacen) if self.rango_grafico is None else None
+        carpeta_reportes = self.catalogo.rutas(self.perfil)[2]
+        self.exportador = ExportadorWorker(self.almacen.almacenamiento, desde, hasta, series, carpeta_reportes)
+        self.hilo_exportacion = QThread(self)
+        self.exportador.moveToThread(self.hilo_exportacion)
 
-            # Añadir página nueva para el gráfico si es necesario
-            if pdf.get_y() > 200:
-                pdf.add_page()
+        self.dialogo_progreso = QProgressDialog("Generando informe...", "Cancelar", 0, 100, self)
+        self.dialogo_progreso.setWindowTitle("Exportar a PDF")
+        self.dialogo_progreso.setWindowModality(Qt.NonModal)
+        self.dialogo_progreso.setMinimumDuration(0)
+        self.dialogo_progreso.canceled.connect(self.cancelar_exportacion)
 
-            # Añadir gráfico completo con los 4 subgráficos
-            try:
-                pdf.ln(5)
-                pdf.set_font("Arial", size=12)
-                pdf.cell(200, 8, txt="Gráficos de Evolución", ln=True, align='C')
-                pdf.ln(5)
-                pdf.image(img_path, x=10, w=190)
-            except Exception as img_error:
-                pdf.cell(200, 10, txt=f"Error al insertar gráfico: {str(img_error)}", ln=True, align='C')
-
-            pdf.output(pdf_path)
-
-            QMessageBox.information(self, "Exportado", 
-                f"✅ Exportación completada:\n\n"
-                f"📄 PDF: {pdf_path}\n"
-                f"🖼️ Imagen (4 gráficos): {img_path}\n\n"
-                f"El archivo contiene todos los gráficos de seguimiento.")
+        self.hilo_exportacion.started.connect(self.exportador.ejecutar)
+        self.exportador.progreso.connect(self.actualizar_progreso_exportacion)
+        self.exportador.terminado.connect(self.exportacion_terminada)
+        self.exportador.error.connect(self.exportacion_fallida)
+        self.exportador.cancelado.connect(self.exportacion_cancelada)
+        self.exportador.finalizado.connect(self.hilo_exportacion.quit)
+        self.hilo_exportacion.finished.connect(self.limpiar_exportacion)
 
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"❌ No se pudo exportar a PDF:\n{str(e)}")
+        self.exportar_btn.setEnabled(False)
+        self.hilo_exportacion.start()
+
+    def cancelar_exportacion(self):
+        # Llamada directa (no por señal): el hilo del exportador está ocupado
+        # generando el informe y no procesaría eventos hasta terminar
+        if self.exportador is not None:
+            self.exportador.cancelar()
+
+    def actualizar_progreso_exportacion(self, porcentaje, mensaje):
+        if self.dialogo_progreso is not None:
+            self.dialogo_progreso.setValue(porcentaje)
+            self.dialogo_progreso.setLabelText(mensaje)
+
+    def cerrar_dialogo_progreso(self):
+        if self.dialogo_progreso is not None:
+            # Evitar que cerrar el diálogo se interprete como una cancelación
+            self.dialogo_progreso.canceled.disconnect()
+            self.dialogo_progreso.close()
+            self.dialogo_progreso = None
+
+    def exportacion_terminada(self, pdf_path):
+        self.cerrar_dialogo_progreso()
+        QMessageBox.information(self, "Exportado", 
+            f"✅ Exportación completada:\n\n"
+            f"📄 PDF: {pdf_path}\n\n"
+            f"El archivo contiene todos los gráficos de seguimiento.")
+
+    def exportacion_fallida(self, mensaje):
+        self.cerrar_dialogo_progreso()
+        QMessageBox.critical(self, "Error", f"❌ No se pudo exportar a PDF:\n{mensaje}")
+
+    def exportacion_cancelada(self):
+        self.cerrar_dialogo_progreso()
+        print("⏹️ Exportación cancelada")
+
+    def detener_exportacion(self):
+        """Cancelar el informe en curso y esperar a que su hilo termine (al salir):
+        un QThread destruido mientras aún se ejecuta aborta el proceso"""
+        if self.hilo_exportacion is None:
+            return
+        self.exportador.cancelar()
+        self.hilo_exportacion.quit()
+        self.hilo_exportacion.wait()
+
+    def limpiar_exportacion(self):
+        self.exportador.deleteLater()
+        self.hilo_exportacion.deleteLater()
+        self.exportador = None
+        self.hilo_exportacion = None
+        self.exportar_btn.setEnabled(True)
 
 if __name__ == "__main__":
+    marcar_fase("Importar PyQt5")
     app = QApplication(sys.argv)
     
     # Configuración específica para GNOME3 y AppIndicator
@@ -898,6 +1496,7 @@ if __name__ == "__main__":
     os.environ['QT_QPA_PLATFORMTHEME'] = 'gtk3'
     
     window = SintomasApp()
+    marcar_fase("Crear ventana")
     window.show()
     
     # Asegurar que la ventana tenga el foco y se muestre correctamente
@@ -0,0 +1,108 @@
+"""Perfiles: un historial independiente por persona y un catálogo que los resume"""
+import json
+import os
+import re
+from datetime import datetime
+
+ARCHIVO = "registro_sintomas.csv"
+BASE_DATOS = "registro_sintomas.db"
+CARPETA_REPORTES = "reportes"
+
+CARPETA_PERFILES = "perfiles"
+CATALOGO = "catalogo.json"
+# El perfil principal usa los archivos de siempre, en la carpeta de trabajo
+PERFIL_PRINCIPAL = "Principal"
+
+
+def _carpeta_para(nombre):
+    return re.sub(r"[^\w-]+", "_", nombre.strip()).strip("_")
+
+
+class CatalogoPerfiles:
+    """Índice de perfiles en un único JSON: carpeta, número de registros,
+    primera y última fecha y última actualización de cada uno.
+
+    Listar o cambiar de perfil solo lee este archivo; los historiales se
+    abren únicamente al cargar el perfil elegido.
+    """
+
+    def __init__(self, carpeta=CARPETA_PERFILES):
+        self.carpeta = carpeta
+        self.ruta = os.path.join(carpeta, CATALOGO)
+        self._datos = self._leer()
+
+    def _leer(self):
+        try:
+            with open(self.ruta, encoding='utf-8') as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            datos = {}
+        datos.setdefault("ultimo", PERFIL_PRINCIPAL)
+        perfiles = datos.setdefault("perfiles", {})
+        perfiles.setdefault(PERFIL_PRINCIPAL, {"carpeta": ""})
+        return datos
+
+    def _guardar(self):
+        os.makedirs(self.carpeta, exist_ok=True)
+        temporal = self.ruta + ".tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(self._datos, f, indent=2, ensure_ascii=False)
+        os.replace(temporal, self.ruta)
+
+    @property
+    def ultimo(self):
+        """Último perfil abierto (o el principal si ya no existe)"""
+        nombre = self._datos["ultimo"]
+        return nombre if nombre in self._datos["perfiles"] else PERFIL_PRINCIPAL
+
+    def perfiles(self):
+        """Nombre -> datos del catálogo de cada perfil, en orden alfabético"""
+        return dict(sorted(self._datos["perfiles"].items()))
+
+    def crear(self, nombre):
+        nombre = nombre.strip()
+        carpeta = _carpeta_para(nombre)
+        if not carpeta:
+            raise ValueError("El nombre del perfil no puede estar vacío.")
+        if nombre in self._datos["perfiles"]:
+            raise ValueError(f"Ya existe un perfil llamado «{nombre}».")
+        if any(datos["carpeta"] == os.path.join(self.carpeta, carpeta)
+               for datos in self._datos["perfiles"].values()):
+            raise ValueError(f"El nombre «{nombre}» coincide con el de otro perfil.")
+
+        ruta = os.path.join(self.carpeta, carpeta)
+        os.makedirs(ruta, exist_ok=True)
+        self._datos["perfiles"][nombre] = {"carpeta": ruta, "registros": 0}
+        self._guardar()
+        return nombre
+
+    def rutas(self, nombre):
+        """Rutas (csv, sqlite, carpeta de reportes) del perfil"""
+        carpeta = self._datos["perfiles"][nombre]["carpeta"]
+        return (os.path.join(carpeta, ARCHIVO), os.path.join(carpeta, BASE_DATOS),
+                os.path.join(carpeta, CARPETA_REPORTES))
+
+    def seleccionar(self, nombre):
+        if nombre not in self._datos["perfiles"]:
+            raise ValueError(f"No existe el perfil «{nombre}».")
+        self._datos["ultimo"] = nombre
+        self._guardar()
+
+    def actualizar(self, nombre, registros, primera_fecha=None, ultima_fecha=None):
+        """Guardar el resumen del historial del perfil tras cargarlo o modificarlo"""
+        datos = self._datos["perfiles"][nombre]
+        datos["registros"] = registros
+        datos["primera_fecha"] = primera_fecha.strftime('%d-%m-%Y') if primera_fecha is not None else None
+        datos["ultima_fecha"] = ultima_fecha.strftime('%d-%m-%Y') if ultima_fecha is not None else None
+        datos["actualizado"] = datetime.now().strftime('%d-%m-%Y %H:%M')
+        self._guardar()
+
+    def descripcion(self, nombre):
+        """Texto de una línea para elegir el perfil en una lista"""
+        datos = self._datos["perfiles"][nombre]
+        registros = datos.get("registros")
+        if registros is None:
+            return f"{nombre} (sin abrir todavía)"
+        if not registros:
+            return f"{nombre} (sin registros)"
+        return f"{nombre} ({registros} registros, {datos['primera_fecha']} a {datos['ultima_fecha']})"
@@ -1,10 +1,15 @@
 import os
 import sys
+import json
+import hashlib
 import platform
 import subprocess
 import venv
 from pathlib import Path
 
+# Huella de la última instalación: si no cambia, no se vuelve a ejecutar pip
+SELLO_INSTALACION = os.path.join('.venv', '.instalacion.json')
+
 def is_venv_exists():
     venv_dir = '.venv'
     return os.path.exists(venv_dir) and os.path.isdir(venv_dir)
@@ -23,6 +28,35 @@ def get_pip_executable():
         return os.path.join('.venv', 'Scripts', 'pip.exe')
     return os.path.join('.venv', 'bin', 'pip')
 
+def get_python_version(python_exe):
+    resultado = subprocess.run(
+        [python_exe, '-c', 'import sys; print(sys.version)'],
+        capture_output=True, text=True, check=True
+    )
+    return resultado.stdout.strip()
+
+def calcular_huella(requirements_file):
+    with open(requirements_file, 'rb') as f:
+        requisitos = hashlib.sha256(f.read()).hexdigest()
+    return {
+        'requirements': requisitos,
+        'python': get_python_version(get_python_executable()),
+    }
+
+def leer_sello():
+    try:
+        with open(SELLO_INSTALACION, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def guardar_sello(huella):
+    with open(SELLO_INSTALACION, 'w', encoding='utf-8') as f:
+        json.dump(huella, f, indent=2)
+
+def dependencias_actualizadas(huella):
+    return leer_sello() == huella
+
 def install_requirements():
     pip_exe = get_pip_executable()
     requirements_file = 'requirements.txt'
@@ -34,10 +68,17 @@ def install_requirements():
         print(f"Error: {requirements_file} not found")
         sys.exit(1)
     
+    # fpdf2 sustituye a PyFPDF (fpdf) y ambos instalan el mismo paquete
+    # "fpdf": si el antiguo sigue en el entorno se quitan los dos, para que
+    # fpdf2 se instale limpio a continuación
+    if subprocess.run([pip_exe, 'show', 'fpdf'], capture_output=True).returncode == 0:
+        print("Desinstalando fpdf (PyFPDF), sustituido por fpdf2...")
+        subprocess.run([pip_exe, 'uninstall', '-y', 'fpdf', 'fpdf2'], check=True)
+    
     print("Instalando dependencias desde requirements.txt...")
     subprocess.run([pip_exe, 'install', '-r', requirements_file], check=True)
 
-def run_main_app():
+def run_main_app(argumentos):
     python_exe = get_python_executable()
     main_file = 'main.py'
     
@@ -46,18 +87,38 @@ def run_main_app():
         sys.exit(1)
     
     print("Iniciando la aplicación...")
-    subprocess.run([python_exe, main_file], check=True)
+    if platform.system().lower() == 'windows':
+        # En Windows exec no reemplaza el proceso de forma fiable
+        subprocess.run([python_exe, main_file] + argumentos, check=True)
+    else:
+        # Sustituir este proceso por la aplicación: sin un Python intermedio
+        os.execv(python_exe, [python_exe, main_file] + argumentos)
 
 def main():
     # Cambiar al directorio que contenga este script
     os.chdir(Path(__file__).parent)
     
+    # --reinstall fuerza la instalación; el resto de argumentos van a main.py
+    argumentos = sys.argv[1:]
+    forzar = '--reinstall' in argumentos
+    argumentos = [a for a in argumentos if a != '--reinstall']
+    
     if not is_venv_exists():
         create_venv()
     
     try:
-        install_requirements()
-        run_main_app()
+        if not os.path.exists('requirements.txt'):
+            print("Error: requirements.txt not found")
+            sys.exit(1)
+        
+        huella = calcular_huella('requirements.txt')
+        if forzar or not dependencias_actualizadas(huella):
+            install_requirements()
+            guardar_sello(huella)
+        else:
+            print("Dependencias al día, se omite la instalación (usa --reinstall para forzarla)")
+        
+        run_main_app(argumentos)
     except subprocess.CalledProcessError as e:
         print(f"Error ocurrido: {e}")
         sys.exit(1)
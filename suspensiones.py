@@ -0,0 +1,221 @@
+"""Efecto de la suspensión de cada medicamento sobre los síntomas"""
+import numpy as np
+import pandas as pd
+
+from analitica import SINTOMAS
+from codificacion import SUSPENSION, codificar_columna, codigos_columna
+
+MEDICAMENTOS = {
+    "Respibien": "Respibien_Suspendido",
+    "Utabon": "Utabon_Suspendido",
+}
+# Días transcurridos desde la suspensión para cada posición de la escala
+# compartida, en días enteros; «no» (la posición 0) y los valores
+# desconocidos (el código -1, la última) no cuentan como suspensión
+_DIAS = np.append(np.floor(np.array(list(SUSPENSION.values()), dtype=float)), np.nan)
+_DIAS[0] = np.nan
+
+# Días antes y después de la suspensión que se comparan
+VENTANA_COMPARACION = 14
+# Retrasos (en días) con los que se busca la correlación más fuerte
+RETARDOS = range(0, 8)
+# Se considera mejoría una bajada del 20 % respecto a la media previa,
+# con la media móvil de 3 días para no reaccionar a un único registro
+MEJORA_RELATIVA = 0.2
+DIAS_SUAVIZADO = 3
+
+
+def fecha_suspension(df, columna):
+    """Fecha estimada de la primera suspensión registrada (o None).
+
+    Dentro del primer tramo de registros con el medicamento suspendido se
+    usa la respuesta más precisa (la de menos días transcurridos).
+    """
+    if columna not in df.columns or df.empty:
+        return None
+    dias = _dias_suspension(df, columna)
+    suspendido = dias.notna()
+    if not suspendido.any():
+        return None
+
+    tramos = (suspendido != suspendido.shift()).cumsum()
+    primer_tramo = tramos == tramos[suspendido].iloc[0]
+    return _mas_precisa(df['Fecha'][primer_tramo], dias[primer_tramo])[1]
+
+
+def _dias_suspension(df, columna):
+    return pd.Series(_DIAS[codigos_columna(df, columna)], index=df.index)
+
+
+def _mas_precisa(fechas, dias):
+    # (días, fecha estimada) de la respuesta con menos días transcurridos;
+    # a igualdad, la fecha más temprana
+    estimadas = fechas.dt.normalize() - pd.to_timedelta(dias, unit='D')
+    orden = np.lexsort((estimadas.to_numpy(), dias.to_numpy()))
+    return dias.iloc[orden[0]], estimadas.iloc[orden[0]]
+
+
+class SuspensionesPorLotes:
+    """Fecha de la primera suspensión de cada medicamento, calculada lote a
+    lote (en el orden del historial) sin conservar los registros.
+
+    Junto con las medias diarias de AnaliticaSintomas da el mismo resultado
+    que analizar_suspensiones() sobre el historial completo.
+    """
+
+    def __init__(self):
+        # medicamento -> (días, fecha) más precisa del primer tramo suspendido
+        self._mejor = {medicamento: None for medicamento in MEDICAMENTOS}
+        # medicamentos cuyo primer tramo ya está abierto o ya ha terminado
+        self._en_tramo = set()
+        self._terminados = set()
+
+    def agregar_lote(self, lote):
+        for medicamento, columna in MEDICAMENTOS.items():
+            if medicamento in self._terminados or columna not in lote.columns:
+                continue
+            dias = _dias_suspension(lote, columna)
+            suspendido = dias.notna().to_numpy()
+            if medicamento in self._en_tramo:
+                inicio = 0
+            elif suspendido.any():
+                inicio = int(suspendido.argmax())
+                self._en_tramo.add(medicamento)
+            else:
+                continue
+
+            # El tramo sigue en el lote siguiente si llega hasta el final de este
+            fuera = np.flatnonzero(~suspendido[inicio:])
+            fin = inicio + int(fuera[0]) if len(fuera) else len(lote)
+            if len(fuera):
+                self._terminados.add(medicamento)
+            if fin > inicio:
+                candidata = _mas_precisa(lote['Fecha'].iloc[inicio:fin], dias.iloc[inicio:fin])
+                actual = self._mejor[medicamento]
+                if actual is None or candidata < actual:
+                    self._mejor[medicamento] = candidata
+
+    def analizar(self, diarias):
+        """Resultado del análisis a partir de las medias diarias de los síntomas"""
+        fechas = {medicamento: None if mejor is None else mejor[1]
+                  for medicamento, mejor in self._mejor.items()}
+        return analizar_diarias(diarias, fechas)
+
+
+def series_diarias(df):
+    """Media diaria de cada síntoma, con un valor (o NaN) por cada día del rango"""
+    valores = pd.DataFrame(index=df.index)
+    for sintoma in SINTOMAS:
+        if sintoma == "Dolor":
+            valores[sintoma] = codificar_columna(df, sintoma)
+        elif sintoma in df.columns:
+            valores[sintoma] = pd.to_numeric(df[sintoma], errors='coerce')
+    diarias = valores.groupby(df['Fecha'].dt.normalize()).mean()
+    return diarias.reindex(pd.date_range(diarias.index.min(), diarias.index.max(), freq='D'))
+
+
+def analizar_suspensiones(df):
+    """Para cada medicamento suspendido y cada síntoma: medias antes y después,
+    días hasta la mejoría y la correlación más fuerte con retraso.
+
+    Devuelve {medicamento: None | {"fecha": Timestamp, "sintomas": {...}}}.
+    """
+    if df.empty:
+        return {medicamento: None for medicamento in MEDICAMENTOS}
+    fechas = {medicamento: fecha_suspension(df, columna) for medicamento, columna in MEDICAMENTOS.items()}
+    return analizar_diarias(series_diarias(df), fechas)
+
+
+def analizar_diarias(diarias, fechas):
+    """analizar_suspensiones() a partir de las medias diarias de los síntomas
+    y la fecha de suspensión de cada medicamento (o None)"""
+    resultado = {medicamento: None for medicamento in MEDICAMENTOS}
+    if diarias.empty:
+        return resultado
+
+    suavizadas = diarias.rolling(DIAS_SUAVIZADO, min_periods=1).mean()
+    for medicamento, fecha in fechas.items():
+        if fecha is None:
+            continue
+
+        antes = diarias.loc[fecha - pd.Timedelta(days=VENTANA_COMPARACION):fecha - pd.Timedelta(days=1)]
+        despues = diarias.loc[fecha + pd.Timedelta(days=1):fecha + pd.Timedelta(days=VENTANA_COMPARACION)]
+        # Indicador escalón: 0 antes de la suspensión y 1 desde ese día
+        indicador = pd.Series((diarias.index >= fecha).astype(float), index=diarias.index)
+
+        sintomas = {}
+        for sintoma in diarias.columns:
+            media_antes = antes[sintoma].mean()
+            media_despues = despues[sintoma].mean()
+            sintomas[sintoma] = {
+                "antes": media_antes,
+                "despues": media_despues,
+                "diferencia": media_despues - media_antes,
+                "dias_hasta_mejoria": _dias_hasta_mejoria(suavizadas[sintoma], fecha, media_antes),
+                **_mejor_correlacion(diarias[sintoma], indicador),
+            }
+        resultado[medicamento] = {"fecha": fecha, "sintomas": sintomas}
+    return resultado
+
+
+def _dias_hasta_mejoria(suavizada, fecha, media_antes):
+    if pd.isna(media_antes) or media_antes <= 0:
+        return None
+    posteriores = suavizada.loc[fecha:]
+    mejores = posteriores[posteriores <= media_antes * (1 - MEJORA_RELATIVA)]
+    return None if mejores.empty else (mejores.index[0] - fecha).days
+
+
+def _mejor_correlacion(serie, indicador):
+    # Correlación del síntoma k días después con el hecho de haber suspendido;
+    # la más negativa indica con qué retraso se nota más la bajada
+    # (un síntoma constante no tiene correlación definida: queda NaN)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        correlaciones = pd.Series({k: serie.shift(-k).corr(indicador) for k in RETARDOS}).dropna()
+    if correlaciones.empty:
+        return {"correlacion": None, "retardo": None}
+    retardo = correlaciones.idxmin()
+    return {"correlacion": float(correlaciones[retardo]), "retardo": int(retardo)}
+
+
+class AnalizadorSuspensiones:
+    """Resultado del análisis guardado por versión del historial (cada
+    historial abierto necesita su propio analizador: las versiones de dos
+    historiales distintos pueden coincidir)"""
+
+    def __init__(self):
+        self._version = None
+        self._resultado = None
+
+    def analizar(self, almacen):
+        if almacen.version != self._version:
+            self._resultado = analizar_suspensiones(almacen.df)
+            self._version = almacen.version
+        return self._resultado
+
+
+def describir_analisis(resultado):
+    """Líneas de texto con las conclusiones, para la interfaz y el informe"""
+    lineas = []
+    for medicamento, datos in resultado.items():
+        if datos is None:
+            lineas.append(f"{medicamento}: no consta ninguna suspensión en el periodo.")
+            continue
+
+        lineas.append(f"{medicamento}: suspendido hacia el {datos['fecha'].strftime('%d-%m-%Y')}")
+        for sintoma, efecto in datos["sintomas"].items():
+            partes = []
+            if pd.isna(efecto["antes"]):
+                partes.append(f"sin registros en los {VENTANA_COMPARACION} días previos")
+            elif pd.isna(efecto["despues"]):
+                partes.append(f"sin registros en los {VENTANA_COMPARACION} días posteriores")
+            else:
+                partes.append(f"media {efecto['antes']:.1f} -> {efecto['despues']:.1f} "
+                              f"({efecto['diferencia']:+.1f}) en {VENTANA_COMPARACION} días antes/después")
+            if efecto["dias_hasta_mejoria"] is not None:
+                dias = efecto['dias_hasta_mejoria']
+                partes.append(f"mejora tras {dias} día{'' if dias == 1 else 's'}")
+            if efecto["correlacion"] is not None:
+                partes.append(f"correlación {efecto['correlacion']:+.2f} con {efecto['retardo']} días de retraso")
+            lineas.append(f"   {SINTOMAS[sintoma]}: " + "; ".join(partes))
+    return lineas
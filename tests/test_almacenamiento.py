@@ -0,0 +1,55 @@
+"""Lectura del CSV por lotes: cuarentena de las líneas ilegibles y orden de fecha"""
+import csv
+
+import pandas as pd
+
+from almacenamiento import COLUMNAS, AlmacenamientoCSV, leer_csv
+
+
+def _fila(dia, nota):
+    return [f"{dia:02d}-01-2025", 5, 3, "no", "no", "no", "no", 1, "no", "no",
+            "no", "no", "no", "", 1, "sin cambios", nota]
+
+
+def _csv_con_comilla_sin_cerrar(ruta):
+    with open(ruta, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(COLUMNAS)
+        escritor.writerows([_fila(1, "bien"), _fila(2, "bien")])
+        f.write('03-01-2025,5,3,no,no,no,no,1,no,no,no,no,no,,1,sin cambios,"nota sin cerrar\r\n')
+        escritor.writerow(_fila(4, "bien"))
+
+
+def test_leer_lotes_aparta_comilla_sin_cerrar(tmp_path):
+    ruta = str(tmp_path / "historial.csv")
+    _csv_con_comilla_sin_cerrar(ruta)
+    lotes = list(AlmacenamientoCSV(ruta).leer_lotes(tamano=1))
+    assert [len(lote) for lote in lotes] == [1, 1]
+    with open(ruta + ".cuarentena", encoding='utf-8') as f:
+        apartadas = list(csv.reader(f))
+    assert [linea[0][:10] for linea in apartadas] == ["03-01-2025", "04-01-2025"]
+
+
+def test_leer_csv_aparta_comilla_sin_cerrar(tmp_path):
+    ruta = str(tmp_path / "historial.csv")
+    _csv_con_comilla_sin_cerrar(ruta)
+    df = leer_csv(ruta)
+    assert df['Notas'].tolist() == ["bien", "bien"]
+    assert (tmp_path / "historial.csv.cuarentena").exists()
+
+
+def test_leer_lotes_en_orden_de_fecha_tras_importar_anteriores(tmp_path):
+    ruta = str(tmp_path / "historial.csv")
+    almacenamiento = AlmacenamientoCSV(ruta)
+    almacenamiento.crear()
+    for dia in (3, 4, 5):
+        almacenamiento.agregar(_fila(dia, f"día {dia}"))
+    assert [len(lote) for lote in almacenamiento.leer_lotes(tamano=2)] == [2, 1]
+
+    anteriores = leer_csv(ruta).head(2)
+    anteriores['Fecha'] -= pd.Timedelta(days=2)
+    anteriores['Notas'] = ["día 1", "día 2"]
+    almacenamiento.importar(anteriores)
+    lotes = list(almacenamiento.leer_lotes(tamano=2))
+    assert [len(lote) for lote in lotes] == [2, 2, 1]
+    assert pd.concat(lotes)['Notas'].tolist() == [f"día {dia}" for dia in range(1, 6)]
@@ -0,0 +1,65 @@
+"""Informe PDF con celdas vacías y notas de varias líneas"""
+import csv
+
+import numpy as np
+import pandas as pd
+from fpdf import FPDF
+
+import pytest
+
+from almacenamiento import COLUMNAS, AlmacenamientoCSV, AlmacenamientoSQLite, leer_csv
+from exportacion import _DisenoTabla, _numeros, exportar_informe
+
+
+def _escribir(ruta, columnas, filas):
+    with open(ruta, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(columnas)
+        escritor.writerows(filas)
+
+
+def test_numeros_vacios_quedan_en_blanco():
+    assert _numeros(pd.Series([3.0, np.nan, 7.4])).tolist() == ["3", "", "7"]
+
+
+def test_lineas_con_numero_vacio_y_nota_multilinea():
+    lote = pd.DataFrame({
+        "Fecha": pd.to_datetime(["01-01-2025"], format="%d-%m-%Y"),
+        "Congestion": [5.0], "Estornudos": [np.nan],
+        "Notas": ["línea 1\nlínea 2  con   espacios"],
+    })
+    (lineas,) = _DisenoTabla(FPDF()).lineas(lote)
+    assert len(lineas) == 1
+    assert lineas[0].endswith("línea 1 línea 2 con espacios")
+    assert "\n" not in lineas[0]
+
+
+def test_exportar_con_celda_numerica_vacia(tmp_path):
+    fila = ["01-01-2025", 5, 3, "no", "no", "no", "no", "", "no", "no", "no",
+            "no", "no", "", 1, "sin cambios", "línea 1\nlínea 2"]
+    _escribir(tmp_path / "historial.csv", COLUMNAS, [fila])
+    ruta = exportar_informe(AlmacenamientoCSV(str(tmp_path / "historial.csv")),
+                            str(tmp_path / "reportes"), cache=False)
+    assert (tmp_path / "reportes").joinpath(ruta.rsplit("/", 1)[-1]).exists()
+
+
+def test_exportar_csv_antiguo_sin_columnas(tmp_path):
+    _escribir(tmp_path / "antiguo.csv", ["Fecha", "Congestion", "Picor", "Notas"],
+              [["01-01-2025", 5, "", "sin picor anotado"], ["02-01-2025", 4, 2, ""]])
+    ruta = exportar_informe(AlmacenamientoCSV(str(tmp_path / "antiguo.csv")),
+                            str(tmp_path / "reportes"), cache=False)
+    assert ruta.endswith(".pdf")
+
+
+@pytest.mark.parametrize("Almacenamiento, nombre", [(AlmacenamientoCSV, "historial.csv"),
+                                                    (AlmacenamientoSQLite, "historial.db")])
+def test_exportar_sin_congestion_ni_picor(tmp_path, Almacenamiento, nombre):
+    fila = ["", "", "no", "no", "no", "no", "", "no", "no", "no", "no", "no", "", "", "sin cambios", ""]
+    _escribir(tmp_path / "vacio.csv", COLUMNAS, [["01-01-2025"] + fila, ["02-01-2025"] + fila])
+    almacenamiento = Almacenamiento(str(tmp_path / nombre))
+    almacenamiento.crear()
+    almacenamiento.importar(leer_csv(str(tmp_path / "vacio.csv")))
+    resumen = almacenamiento.resumen()
+    assert (resumen["registros"], resumen["congestion_media"], resumen["picor_media"]) == (2, None, None)
+    ruta = exportar_informe(almacenamiento, str(tmp_path / "reportes"), cache=False)
+    assert ruta.endswith(".pdf")